@@ -2,11 +2,12 @@
 from asyncio import (get_event_loop, ensure_future, gather, sleep)
 import sys
 import getopt
+import time
 import logging
 from typing import (Optional)
 from urllib.parse import (urlparse, urlunparse)
 
-from robot.robot import Robot
+from robot.robot import (Robot, client_session)
 import settings
 
 settings.log.handlers[0].setFormatter(logging.Formatter('%(message)s', datefmt='%d-%m-%Y %H:%M:%S'))
@@ -31,6 +32,20 @@ def results(res, names=None, prefix=None):
         print(f"{prefix[i]:14s} {sc['total']:9d} {sc['explained']:9d} {sc['guessed']:9d}")
 
 
+def setup_report(robots, started):
+    """Time spent by robots to connect and log in, and until game was started"""
+    def ms(stage, since):
+        values = [(r.timings[stage] - r.timings[since]) * 1000 for r in robots if stage in r.timings]
+        if not values:
+            return 'n/a'
+        return f'avg {sum(values) / len(values):.1f} ms, max {max(values):.1f} ms'
+
+    print()
+    print(f"Setup of {len(robots)} robots: connect {ms('connect', 'start')}, login {ms('setup', 'connect')}")
+    if 'play' in robots[0].timings:
+        print(f"First play sent {(robots[0].timings['play'] - started) * 1000:.1f} ms after start")
+
+
 class Options:
 
     id: Optional[str]
@@ -39,6 +54,7 @@ class Options:
     speed: int
     site: str
     reset: bool
+    limit: int
 
     @staticmethod
     def usage(err=None):
@@ -59,6 +75,7 @@ Flags:
     -w, --words <wnum>  Set words number to <wnum>
     -u, --site  <uri>   Set server host to <uri> (may be with port)
     -R, --reset         Reset existing game
+    -l, --limit <num>   Limit connections shared by all robots to <num>, websockets included (default: 0 - no limit)
 """, file=sys.stderr)
         sys.exit(1)
 
@@ -72,10 +89,11 @@ Flags:
         self.words = 6
         self.site = f'http://{settings.SITE_HOST}:{settings.SITE_PORT}'
         self.reset = False
+        self.limit = 0
 
         try:
             opts, args = getopt.getopt(argv[1:],
-                                       "ha:p:r:s:n:t:w:u:R",
+                                       "ha:p:r:s:n:t:w:u:Rl:",
                                        [
                                            'help',
                                            'auto=',
@@ -86,7 +104,8 @@ Flags:
                                            'timer=',
                                            'words=',
                                            'site=',
-                                           'reset'
+                                           'reset',
+                                           'limit='
             ])
         except getopt.GetoptError as err:
             # print help information and exit:
@@ -115,6 +134,8 @@ Flags:
                 self.site = a
             elif o in ("-R", "--reset"):
                 self.reset = True
+            elif o in ("-l", "--limit"):
+                self.limit = int(a)
             else:
                 Options.usage(f"unhandled option {o}")
 
@@ -149,8 +170,14 @@ Flags:
 
 async def main():
     opts = Options(sys.argv)
+    started = time.perf_counter()
+
+    async with client_session(opts.limit) as session:
+        await play(opts, session, started)
+
 
-    r = Robot(**opts.args())
+async def play(opts, session, started):
+    r = Robot(**opts.args(), session=session)
     try:
         if opts.id is None:
             """Create new game if id was not specified"""
@@ -174,15 +201,17 @@ async def main():
         await sleep(0.2)  # Leader process should be able to reset game
 
         for i in range(1, opts.robots):
-            r = Robot(uri=opts.site, idx=i, id=opts.id)
+            r = Robot(uri=opts.site, idx=i, id=opts.id, session=session)
             rbs.append(r)
             wrk.append(ensure_future(r.run()))
 
         await gather(*wrk)
         results(wrk[0].result(), [r.pname for r in rbs], [r.id_prefix for r in rbs])
+        setup_report(rbs, started)
     else:
         res = await r.run(pnum=opts.autoplay)
         results(res)
+        setup_report([r], started)
 
 if __name__ == '__main__':
     loop = get_event_loop()
@@ -2,14 +2,29 @@
 from aiohttp import web
 import weakref
 
+import asyncio
 import datetime
+import multiprocessing
+import os
+import signal
+import time
 import settings
 from settings import log
-from game.views import NewGame, GetGame, ListGames, Login, WebSocket
+from game.cluster import (Cluster, DEFAULT_ID, affinity)
+from game.eventlog import EventLog
+from game.recorder import Recorder
+from game.transport import (LocalSocketTransport, Transport)
+from game.expiry import ExpiryIndex
+from game.registry import GameRegistry
+from game.lobby import Lobby
+from game import snapshot
+from game.metrics import METRICS
+from game.clock import CLOCK
+from game.views import NewGame, GetGame, GameStats, GetMetrics, ListGames, LobbySocket, Login, WebSocket
 from game.hat import HatGame
 from game.timer import Scheduler
 
-default_id = '00000000-0000-0000-0000-000000000000'
+default_id = DEFAULT_ID
 
 
 async def on_shutdown(app):
@@ -17,6 +32,57 @@ async def on_shutdown(app):
         await ws.close(code=1001, message='Server shutdown')
 
 
+async def save_games(app):
+    """Snapshot all games on shutdown, next process continues them"""
+    if app.journal is not None:
+        await app.journal.snapshot(app.games)  # nothing left to replay on startup
+    elif app.snapshot_file:
+        await snapshot.save(app.games, app.snapshot_file)
+
+
+async def restore_games(app):
+    """Continue games of previous process, players get back through 'name' reconnect"""
+    if app.journal is not None:
+        games = await app.journal.recover(HatGame)
+        if default_id in app.games and default_id not in games:
+            app.games[default_id].start_journal(app.journal)
+    elif app.snapshot_file and os.path.isfile(app.snapshot_file):
+        games = snapshot.load(app.snapshot_file)
+        for g in games.values():
+            g.resume()
+    else:
+        return
+
+    for g in games.values():
+        g.journal = app.journal
+        app.expiry.add(g)
+    app.games.update(games)
+
+
+async def snapshot_games(app):
+    """Snapshot all games to keep replay on restart short"""
+    if app.journal.records:
+        await app.journal.snapshot(app.games)
+
+
+async def close_lobby(app):
+    app.lobby.close()
+
+
+async def flush_recordings(app):
+    if app.recorder is None:
+        return
+    for g in app.games.values():
+        if g.recording is not None:
+            await g.recording.flush()
+    app.recorder.close()
+
+
+async def close_journal(app):
+    if app.journal is not None:
+        await app.journal.close()
+
+
 async def shutdown(server, app, handler):
     server.close()
     await server.wait_closed()
@@ -28,45 +94,159 @@ async def shutdown(server, app, handler):
 async def expire_games(app):
     """Kill games which are inactive longer then settings.GAME_INACTIVITY_TTL"""
 
-    now = datetime.datetime.now()
+    started = time.perf_counter()
+    now = CLOCK.now()
 
-    for g in list(app.games.values()):
-        inactive = now - g.last_event_time
+    expired = app.expiry.expired(app.games, now)
+    for g in expired:
+        inactive = datetime.timedelta(seconds=int(now - g.last_event_time))
 
-        if inactive > datetime.timedelta(seconds=settings.GAME_INACTIVITY_TTL):
-            if g.id != default_id or g.state != HatGame.ST_SETUP:
-                log.info(f"Expire game ID={g.id} name='{g.game_name}', inactivity = {inactive}")
+        if g.id != default_id or g.state != HatGame.ST_SETUP:
+            log.info(f"Expire game ID={g.id} name='{g.game_name}', inactivity = {inactive}")
 
+        async with g.lock:
             await g.reset()  # disconnect all, reset state
-
-            if g.id != default_id:  # do not delete default game
-                del app.games[g.id]
-
-
-app = web.Application()
-app.websockets = weakref.WeakSet()
-app.games = {}
-
-# default game, temporary, hackish
-app.games[default_id] = HatGame(name='Secret Tea')
-app.games[default_id].id = default_id
-
-app.add_routes((
-    web.get('/', Login, name='login'),
-    web.get('/games/{id}', GetGame, name='get_game'),
-    web.get('/games', ListGames, name='list_games'),
-    web.post('/games', NewGame, name='new_game'),
-    web.get('/ws/{id}', WebSocket, name='game'),
-    web.get('/ws', WebSocket),  # default game
-))
-
-if settings.NEED_CORS:
-    app.add_routes(
-        [web.options('/games', NewGame, name='cors')]
-    )
-
-
-cron = Scheduler(60, expire_games, app)
+            g.record('reset')
+
+        if g.recording is not None:
+            await g.recording.flush()
+
+        if g.id != default_id:  # do not delete default game
+            g.record('delete')
+            del app.games[g.id]
+        else:
+            app.expiry.add(g)
+
+    METRICS.count('games_expired', len(expired))
+    METRICS.timer('expire_games').observe((time.perf_counter() - started) * 1000)
+
+
+async def start_cron(app):
+    app.cron = [Scheduler(settings.EXPIRE_INTERVAL, expire_games, app)]
+    if app.journal is not None:
+        app.cron.append(Scheduler(settings.EVENTLOG_SNAPSHOT, snapshot_games, app))
+
+
+async def stop_cron(app):
+    for c in app.cron:
+        c.cancel()
+
+
+async def start_transport(app):
+    if app.transport is not None:
+        await app.transport.start()
+
+
+async def close_cluster(app):
+    if app.transport is not None:
+        await app.transport.close()
+    if app.cluster is not None:
+        await app.cluster.close()
+
+
+def make_app(cluster: Cluster = None, transport: Transport = None) -> web.Application:
+    """Application serving all games, or games owned by one worker of cluster
+
+    Players of games owned by other worker are connected through `transport` if it is given,
+    otherwise their websockets are proxied to the owner
+    """
+    app = web.Application(middlewares=[affinity])
+    app.websockets = weakref.WeakSet()
+    app.games = GameRegistry()
+    app.lobby = Lobby(app.games, cluster=cluster)
+    app.cluster = cluster
+    app.transport = transport
+    if transport is not None:
+        transport.games = app.games
+    app.expiry = ExpiryIndex(settings.GAME_INACTIVITY_TTL)
+
+    # each worker keeps its own event log / snapshot
+    suffix = f'.{cluster.worker}' if cluster else ''
+    app.journal = EventLog(settings.EVENTLOG_DIR + suffix) if settings.EVENTLOG_DIR else None
+    app.snapshot_file = settings.SNAPSHOT_FILE + suffix if settings.SNAPSHOT_FILE else None
+    app.recorder = Recorder(settings.RECORD_DIR) if settings.RECORD_DIR else None
+
+    # default game, temporary, hackish
+    if cluster is None or cluster.owns(default_id):
+        g = HatGame(name='Secret Tea')
+        g.id = default_id
+        app.games[default_id] = g
+        app.expiry.add(g)
+        g.start_journal(None)  # journal is started on restore, seq of created game anyway
+        if app.recorder is not None:
+            app.recorder.start(g)
+
+    app.add_routes((
+        web.get('/', Login, name='login'),
+        web.get('/games/{id}', GetGame, name='get_game'),
+        web.get('/games/{id}/stats', GameStats, name='game_stats'),
+        web.get('/games', ListGames, name='list_games'),
+        web.post('/games', NewGame, name='new_game'),
+        web.get('/lobby', LobbySocket, name='lobby'),
+        web.get('/metrics', GetMetrics, name='metrics'),
+        web.get('/ws/{id}', WebSocket, name='game'),
+        web.get('/ws', WebSocket),  # default game
+    ))
+
+    if settings.NEED_CORS:
+        app.add_routes(
+            [web.options('/games', NewGame, name='cors')]
+        )
+
+    app.on_startup.append(restore_games)
+    app.on_startup.append(start_transport)
+    app.on_startup.append(start_cron)
+    app.on_shutdown.append(save_games)
+    app.on_cleanup.append(stop_cron)
+    app.on_cleanup.append(close_lobby)
+    app.on_cleanup.append(flush_recordings)
+    app.on_cleanup.append(close_journal)
+    app.on_cleanup.append(close_cluster)
+    return app
+
+
+def run_worker(worker: int, workers: int):
+    """Serve games owned by worker: public port is shared by all workers, private one is for other workers"""
+    transport = None
+    if settings.TRANSPORT == 'ipc':
+        transport = LocalSocketTransport(str(worker), settings.TRANSPORT_DIR)
+    app = make_app(Cluster(worker, workers, port=settings.WORKER_PORT), transport)
+
+    async def serve():
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, settings.SITE_HOST, int(settings.SITE_PORT), reuse_port=True).start()
+        await web.TCPSite(runner, '127.0.0.1', settings.WORKER_PORT + worker).start()
+        log.info(f'Worker {worker}/{workers} started')
+
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_event_loop().add_signal_handler(sig, stop.set)
+        await stop.wait()
+        await runner.cleanup()
+
+    asyncio.run(serve())
+
+
+def run_cluster(workers: int):
+    procs = [multiprocessing.Process(target=run_worker, args=(i, workers), name=f'worker-{i}')
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+
+    signal.signal(signal.SIGTERM, lambda *args: [p.terminate() for p in procs])
+    for p in procs:
+        while p.is_alive():
+            try:
+                p.join()
+            except KeyboardInterrupt:
+                pass  # delivered to workers as well, wait them to finish
+
+
+app = make_app()
 
 if __name__ == '__main__':
-    web.run_app(app, host=settings.SITE_HOST, port=settings.SITE_PORT)
+    if settings.WORKERS > 1:
+        run_cluster(settings.WORKERS)
+    else:
+        web.run_app(app, host=settings.SITE_HOST, port=settings.SITE_PORT)
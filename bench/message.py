@@ -0,0 +1,55 @@
+"""
+Message encode/decode micro-benchmark
+
+    $ python -m bench.message [<iterations>]
+"""
+import json
+import sys
+import timeit
+
+import game.message as message
+
+SAMPLES = [
+    message.Game(id="xxxx-id-here", name='Secret Tea', numwords=10, timer=20, state='setup'),
+    message.Turn(turn=10, explain="user1", guess="user2"),
+    message.Next(word="banana"),
+    message.Explained(word="banana"),
+    message.Start(),
+]
+
+INBOUND = [json.loads(str(m)) for m in (
+    message.Name(name='vova', avatar='https://robohash.org/vova'),
+    message.Words(words=["apple", "orange", "banana", "lemon", "melon", "grape"]),
+    message.Ready(),
+    message.Guessed(guessed=True),
+)]
+
+
+def encode_str():
+    for m in SAMPLES:
+        str(m)
+
+
+def encode_bytes():
+    for m in SAMPLES:
+        m.to_json_bytes()
+
+
+def decode():
+    for d in INBOUND:
+        message.ClientMessage.msg(d)
+
+
+def main(n=20000):
+    print(f"{'case':14s} {'msg/s':>12s}")
+    cases = [('encode str', encode_str, len(SAMPLES)), ('decode', decode, len(INBOUND))]
+    if hasattr(message.Message, 'to_json_bytes'):
+        cases.insert(1, ('encode bytes', encode_bytes, len(SAMPLES)))
+
+    for name, fn, k in cases:
+        t = min(timeit.repeat(fn, number=n, repeat=3))
+        print(f'{name:14s} {n * k / t:12.0f}')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
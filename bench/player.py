@@ -0,0 +1,41 @@
+"""
+Player state machine benchmark
+
+    $ python -m bench.player [<iterations>]
+"""
+import logging
+import sys
+import timeit
+
+from settings import log
+from game.player import Player
+
+
+def create():
+    Player(name='Explanee')
+
+
+def turn(p):
+    """One turn cycle, 6 transitions"""
+    p.begin()
+    p.ready()
+    p.play()
+    p.lastanswer()
+    p.finish()
+    p.wait()
+
+
+def main(n=20000):
+    log.setLevel(logging.INFO)  # do not measure debug output
+
+    p = Player(name='Explanee')
+    p.words = ['a']
+
+    t = min(timeit.repeat(create, number=n, repeat=3))
+    print(f'players created/s {n / t:12.0f}')
+    t = min(timeit.repeat(lambda: turn(p), number=n, repeat=3))
+    print(f'transitions/s     {n * 6 / t:12.0f}')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,64 @@
+"""
+Games snapshot/restore benchmark, 6 players games in the middle of a turn
+
+    $ python -m bench.snapshot [<games>]
+"""
+import asyncio
+import logging
+import sys
+import time
+import uuid
+
+from settings import log
+from game import message
+from game import snapshot
+from game.eventlog import NullSocket
+from game.hat import HatGame
+
+
+async def template() -> HatGame:
+    g = HatGame()
+    for i in range(6):
+        ws = NullSocket()
+        await g.name(ws, message.Name(name=f'player{i}'))
+        await g.words(ws, message.Words(words=[f'word{i}-{w}' for w in range(g.num_words)]))
+    await g.play(g.players[0].socket, message.Play())
+
+    for _ in range(5):  # few turns played
+        for p in (g.turn.explaining, g.turn.guessing):
+            await g.ready(p.socket, message.Ready())
+        for guessed in (True, True, False):
+            await g.guessed(g.turn.explaining.socket, message.Guessed(guessed=guessed))
+        await g.expired()
+        await g.guessed(g.turn.explaining.socket, message.Guessed(guessed=True))
+
+    g.cancel_timers()
+    return g
+
+
+async def main(n=10000):
+    log.setLevel(logging.INFO)  # do not measure debug output
+
+    g = await template()
+    data = await snapshot.dumps({g.id: g})
+    games = {}
+    for _ in range(n):
+        c = snapshot.loads(data)[g.id]
+        c.id = str(uuid.uuid4())
+        games[c.id] = c
+
+    started = time.perf_counter()
+    data = await snapshot.dumps(games)
+    dumped = time.perf_counter()
+    restored = snapshot.loads(data)
+    loaded = time.perf_counter()
+
+    assert len(restored) == n
+    print(f'games             {n:12d}')
+    print(f'snapshot bytes    {len(data):12d}')
+    print(f'snapshot, s       {dumped - started:12.3f}')
+    print(f'restore, s        {loaded - dumped:12.3f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*[int(a) for a in sys.argv[1:]]))
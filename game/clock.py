@@ -0,0 +1,33 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class Clock:
+    """Monotonic activity clock shared by all games
+
+    Read at most once per event loop tick: value is cached until loop runs next callbacks batch
+    """
+
+    __now: Optional[float]
+
+    def __init__(self):
+        self.__now = None
+
+    def now(self) -> float:
+        if self.__now is None:
+            now = time.monotonic()
+            try:
+                asyncio.get_running_loop().call_soon(self.__expire)
+            except RuntimeError:
+                return now  # no loop, nobody will expire cached value
+
+            self.__now = now
+
+        return self.__now
+
+    def __expire(self):
+        self.__now = None
+
+
+CLOCK = Clock()
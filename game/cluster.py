@@ -0,0 +1,133 @@
+import asyncio
+import uuid
+import zlib
+from typing import (List, Optional, Tuple)
+
+import aiohttp
+from aiohttp import web
+
+from settings import log
+
+DEFAULT_ID = '00000000-0000-0000-0000-000000000000'  # default game, served on /ws
+
+FORWARDED = 'X-Hat-Forwarded'  # request came from other worker, serve it locally
+
+# hop-by-hop and recalculated headers, not passed through proxy
+SKIP_HEADERS = ('host', 'connection', 'upgrade', 'content-length', 'transfer-encoding', 'keep-alive',
+                'sec-websocket-key', 'sec-websocket-version', 'sec-websocket-extensions', 'sec-websocket-accept')
+
+
+def owner(gid: str, workers: int) -> int:
+    """Worker owning game, stable across processes and restarts"""
+    return zlib.crc32(gid.encode()) % workers
+
+
+class Cluster:
+    """Workers of one service, each game lives in its owner worker only
+
+    All workers accept connections on shared public port, request for game owned
+    by other worker is proxied to private port of the owner
+    """
+
+    worker: int
+    workers: int
+    peers: List[str]  # base URL of each worker private site
+    __session: Optional[aiohttp.ClientSession]
+
+    def __init__(self, worker: int, workers: int, host: str = '127.0.0.1', port: int = None, peers=None):
+        self.worker = worker
+        self.workers = workers
+        self.peers = peers or [f'http://{host}:{port + i}' for i in range(workers)]
+        self.__session = None
+
+    def owner(self, gid: str) -> int:
+        return owner(gid, self.workers)
+
+    def owns(self, gid: str) -> bool:
+        return self.owner(gid) == self.worker
+
+    def new_id(self) -> str:
+        """Random game ID owned by this worker"""
+        while True:
+            gid = str(uuid.uuid4())
+            if self.owns(gid):
+                return gid
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self.__session is None:
+            self.__session = aiohttp.ClientSession()
+        return self.__session
+
+    async def close(self):
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    def headers(self, request: web.Request) -> dict:
+        headers = dict([(k, v) for k, v in request.headers.items() if k.lower() not in SKIP_HEADERS])
+        headers[FORWARDED] = str(self.worker)
+        return headers
+
+    async def forward(self, request: web.Request, worker: int) -> web.StreamResponse:
+        """Proxy request to worker"""
+        url = self.peers[worker] + request.path_qs
+
+        if request.headers.get('Upgrade', '').lower() == 'websocket':
+            return await self.forward_ws(request, url)
+
+        async with self.session.request(
+                request.method, url, headers=self.headers(request), data=await request.read()) as r:
+            headers = dict([(k, v) for k, v in r.headers.items() if k.lower() not in SKIP_HEADERS])
+            return web.Response(status=r.status, body=await r.read(), headers=headers)
+
+    async def forward_ws(self, request: web.Request, url: str) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        request.app.websockets.add(ws)
+
+        async def pump(src, dst):
+            async for msg in src:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    await dst.send_str(msg.data)
+                elif msg.type == aiohttp.WSMsgType.BINARY:
+                    await dst.send_bytes(msg.data)
+                else:
+                    break
+
+        try:
+            async with self.session.ws_connect(url, headers={FORWARDED: str(self.worker)}) as peer:
+                tasks = [asyncio.ensure_future(pump(ws, peer)), asyncio.ensure_future(pump(peer, ws))]
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for t in tasks:
+                    t.cancel()
+        except aiohttp.ClientError as e:
+            log.error(f'Proxy websocket to {url} failed: {e}')
+
+        await ws.close()
+        request.app.websockets.discard(ws)
+        return ws
+
+    async def fetch(self, worker: int, path_qs: str) -> Tuple[object, dict]:
+        """JSON response of worker and its headers"""
+        async with self.session.get(self.peers[worker] + path_qs, headers={FORWARDED: str(self.worker)}) as r:
+            return await r.json(), dict(r.headers)
+
+
+@web.middleware
+async def affinity(request: web.Request, handler):
+    """Route request of game to its owner worker"""
+    cluster = request.app.cluster
+    if cluster is None or FORWARDED in request.headers:
+        return await handler(request)
+
+    gid = request.match_info.get('id')
+    if request.path.startswith('/ws') and gid in (None, 'None'):
+        gid = DEFAULT_ID  # see WebSocket view
+
+    if gid is not None and not cluster.owns(gid):
+        if request.app.transport is not None and request.headers.get('Upgrade', '').lower() == 'websocket':
+            return await request.app.transport.serve(request, str(cluster.owner(gid)), gid)
+        return await cluster.forward(request, cluster.owner(gid))
+
+    return await handler(request)
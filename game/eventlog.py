@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import pickle
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Dict, List, Optional)
+
+import settings
+from settings import log
+
+
+class NullSocket:
+    """Socket of player restored from log, until player reconnects"""
+
+    closed = True
+
+    async def send_str(self, data):
+        pass
+
+    async def close(self, *args, **kwargs):
+        pass
+
+
+class EventLog:
+    """Append-only log of game events, games are rebuilt from it by recover()
+
+    Directory layout, n is segment number:
+        events-<n>.log       one JSON event per line, events of each game numbered by `seq`
+        snapshot-<n>.pickle  state of all games taken when segment n was started
+
+    Events are buffered and written in batches by single writer thread, so append()
+    never blocks event loop and order of events is kept. Snapshot bounds replay time:
+    recovery loads latest snapshot and replays only its segment and newer ones,
+    skipping events already included into game state
+    """
+
+    SEGMENT_RE = re.compile(r'^(events|snapshot)-(\d+)\.(log|pickle)$')
+
+    path: str
+    fsync: bool
+    interval: float
+    segment: int
+    records: int  # number of events appended to current segment
+    __buffer: List[str]
+    __handle: Optional[asyncio.TimerHandle]
+    __file = None  # current segment file, used by writer thread only
+    __file_segment: int
+
+    def __init__(self, path: str, fsync: bool = None, interval: float = None):
+        self.path = path
+        self.fsync = settings.EVENTLOG_FSYNC if fsync is None else fsync
+        self.interval = settings.EVENTLOG_BATCH if interval is None else interval
+        os.makedirs(path, exist_ok=True)
+
+        # never append after possibly torn tail of segment written before restart
+        self.segment = max(self.segments('events') + self.segments('snapshot') + [0]) + 1
+        self.records = 0
+        self.__buffer = []
+        self.__handle = None
+        self.__file_segment = 0
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='eventlog')
+
+    def file(self, kind: str, n: int) -> str:
+        ext = 'log' if kind == 'events' else 'pickle'
+        return os.path.join(self.path, f'{kind}-{n:06d}.{ext}')
+
+    def segments(self, kind: str) -> List[int]:
+        ret = []
+        for f in os.listdir(self.path):
+            m = EventLog.SEGMENT_RE.match(f)
+            if m and m.group(1) == kind:
+                ret.append(int(m.group(2)))
+        return sorted(ret)
+
+    def append(self, gid: str, seq: int, ev: str, **fields) -> None:
+        """Queue event of game `gid`, written within `interval` seconds"""
+        self.__buffer.append(json.dumps(dict(id=gid, seq=seq, ev=ev, **fields), ensure_ascii=False))
+        self.records += 1
+
+        if self.__handle is None:
+            self.__handle = asyncio.get_event_loop().call_later(self.interval, self.__flush)
+
+    def __flush(self):
+        if self.__handle is not None:
+            self.__handle.cancel()
+            self.__handle = None
+
+        lines, self.__buffer = self.__buffer, []
+        if lines:
+            asyncio.get_event_loop().run_in_executor(self.__executor, self.__write, self.segment, lines)
+
+    def __write(self, segment: int, lines: List[str]):
+        """Writer thread: append batch to segment file"""
+        try:
+            if self.__file is None or self.__file_segment != segment:
+                if self.__file is not None:
+                    self.__file.close()
+                self.__file = open(self.file('events', segment), 'a', encoding='utf-8')
+                self.__file_segment = segment
+
+            self.__file.write('\n'.join(lines) + '\n')
+            self.__file.flush()
+            if self.fsync:
+                os.fsync(self.__file.fileno())
+        except OSError as e:
+            log.error(f'Event log write failed, {len(lines)} events lost: {e}')
+
+    async def flush(self) -> None:
+        """Write out buffered events and wait until they are on disk"""
+        self.__flush()
+        await asyncio.get_event_loop().run_in_executor(self.__executor, lambda: None)
+
+    async def snapshot(self, games: Dict[str, object]) -> None:
+        """Start new segment with snapshot of all games, older segments are removed
+
+        Each game is pickled between commands (under its lock), events appended
+        to new segment before game was pickled are skipped on recovery by `seq`
+        """
+        self.__flush()  # buffered events belong to old segment
+        self.segment += 1
+        self.records = 0
+
+        states = {}
+        for gid, g in list(games.items()):
+            async with g.lock:
+                states[gid] = pickle.dumps(g, protocol=pickle.HIGHEST_PROTOCOL)
+
+        await asyncio.get_event_loop().run_in_executor(
+            self.__executor, self.__write_snapshot, self.segment, pickle.dumps(states))
+
+    def __write_snapshot(self, segment: int, data: bytes):
+        """Writer thread: store snapshot atomically, then drop files it supersedes"""
+        try:
+            name = self.file('snapshot', segment)
+            with open(name + '.tmp', 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(name + '.tmp', name)
+
+            for kind in ('events', 'snapshot'):
+                for n in self.segments(kind):
+                    if n < segment:
+                        os.remove(self.file(kind, n))
+        except OSError as e:
+            log.error(f'Event log snapshot #{segment} failed: {e}')
+
+    async def close(self) -> None:
+        await self.flush()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        self.__executor.shutdown()
+
+    def read(self, n: int):
+        """Events of segment n, torn or corrupted lines are skipped"""
+        with open(self.file('events', n), encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    log.warning(f'Skip corrupted event {self.file("events", n)}:{i + 1}')
+
+    async def recover(self, factory) -> dict:
+        """Rebuild games from latest snapshot and events written after it
+
+        `factory(**fields)` creates game from 'new' event, other events are applied
+        by game.replay(event)
+        """
+        games = {}
+        snapshots = self.segments('snapshot')
+        start = snapshots[-1] if snapshots else 0
+        if snapshots:
+            with open(self.file('snapshot', start), 'rb') as f:
+                games = dict([(gid, pickle.loads(state)) for gid, state in pickle.load(f).items()])
+
+        replayed = 0
+        for n in [n for n in self.segments('events') if n >= start]:
+            for event in self.read(n):
+                gid, ev = event['id'], event['ev']
+                g = games.get(gid)
+
+                if g is not None and event['seq'] <= g.seq:
+                    continue  # already in snapshot
+                if g is None and ev != 'new':
+                    continue  # game was removed
+
+                if ev == 'new':
+                    g = games[gid] = factory(
+                        name=event['name'], numwords=event['numwords'], timer=event['timer'], seed=event['seed'])
+                    g.id = gid
+                elif ev == 'delete':
+                    del games[gid]
+                    continue
+                else:
+                    await g.replay(event)
+
+                g.seq = event['seq']
+                replayed += 1
+
+        for g in games.values():
+            g.resume()
+
+        log.info(f'Recovered {len(games)} games from event log, {replayed} events replayed')
+        return games
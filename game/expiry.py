@@ -0,0 +1,51 @@
+import heapq
+from typing import (Dict, List, Set, Tuple)
+
+
+class ExpiryIndex:
+    """Games ordered by inactivity deadline
+
+    Heap entry keeps deadline known at push time. Activity only moves game's deadline
+    forward, so bumping last_event_time costs nothing here: stale entry is refreshed
+    with actual deadline when it reaches heap top. Each tick looks only at games which
+    are due (expired or refreshed once per TTL). Game has one entry at most, adding
+    indexed game again (e.g. recovered one replacing game of the same ID) is no-op
+    """
+
+    ttl: float
+    __heap: List[Tuple[float, str]]
+    __ids: Set[str]  # games having entry in heap
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.__heap = []
+        self.__ids = set()
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def add(self, game) -> None:
+        if game.id in self.__ids:
+            return  # entry is refreshed with actual deadline when due
+        self.__ids.add(game.id)
+        heapq.heappush(self.__heap, (game.last_event_time + self.ttl, game.id))
+
+    def expired(self, games: Dict[str, object], now: float) -> list:
+        """Pop games inactive longer then ttl, entries of already removed games are dropped"""
+        ret = []
+        while self.__heap and self.__heap[0][0] <= now:
+            _, gid = heapq.heappop(self.__heap)
+
+            g = games.get(gid)
+            if g is None:
+                self.__ids.discard(gid)
+                continue
+
+            deadline = g.last_event_time + self.ttl
+            if deadline > now:
+                heapq.heappush(self.__heap, (deadline, gid))
+            else:
+                self.__ids.discard(gid)
+                ret.append(g)
+
+        return ret
@@ -1,32 +1,51 @@
+import settings
 from settings import log
 from . import message
 from .player import Player
+from .outbox import Outbox
+from .wordhat import WordHat
 from .turn import Turn
 from .timer import Timer
+from .metrics import METRICS
+from .clock import CLOCK
+from .eventlog import (EventLog, NullSocket)
+from .recorder import Recording
+from .transport import RemoteSocket
 from shlyapa import Shlyapa, Config
 from robot.words import (NAMES, NOUNS)
 
-import datetime
-import json
+import asyncio
+import time
 import uuid
 import random
-from typing import (List, Dict, Optional)
+from typing import (Callable, List, Dict, Optional)
 
 PlayerList = List[Player]
 PlayerDict = Dict[str, Player]
+OutboxDict = Dict[int, Outbox]
 
-commands = []
+commands = {}
 
 
 def handler(method):
-    """Decorator to mark methods callable through API"""
+    """Decorator to mark methods callable through API, collects per-command metrics"""
+
+    stats = METRICS.command(method.__name__)
 
     async def call(self, *args):
-        self.last_event_time = datetime.datetime.now()
+        self.last_event_time = CLOCK.now()
         log.debug(f'Received command {method.__name__}')
-        await method(self, *args)
 
-    commands.append(method.__name__)
+        started = time.perf_counter()
+        try:
+            await method(self, *args)
+        except Exception:
+            stats.observe(time.perf_counter() - started, error=True)
+            raise
+
+        stats.observe(time.perf_counter() - started)
+
+    commands[method.__name__] = call
 
     return call
 
@@ -41,60 +60,246 @@ class HatGame:
     players: PlayerList
     players_map: PlayerDict
     sockets_map: PlayerDict
+    outboxes: OutboxDict
     num_words: int
     turn_timer: int
     turn: Optional[Turn]
     shlyapa: Optional[Shlyapa]
     timer: Optional[Timer]
     all_words: List[str]
-    tour_words: List[str]
-    last_event_time: datetime.datetime
+    hat: WordHat
+    seed: int
+    rng: Optional[random.Random]  # game own generator, see draw_rng(), created on first draw after restore
+    roster_version: int  # bumped on each change of players set or their words
+    last_event_time: float  # CLOCK.now() of last activity
     results: Optional[dict]
-
-    def __init__(self, name=None, numwords=6, timer=20):
+    score: Dict[str, List[int]]  # live scoreboard: player -> [explained, guessed]
+    tally: List[int]  # live scoreboard: words explained in each tour
+    score_timer: Optional[Timer]
+    timer_left: Optional[float]  # turn time left when game was snapshotted, see resume()
+    seq: int  # number of events recorded for game, see record()
+    journal: Optional[EventLog]
+    recording: Optional[Recording]  # commands and frames of game, see Recorder
+    lock: asyncio.Lock  # commands of game are applied one at a time, in order they are logged
+    on_change: Optional[Callable[['HatGame'], None]]  # called when listed data (name, settings, state) changes
+
+    def __init__(self, name=None, numwords=6, timer=20, seed=None):
+        self.on_change = None
         self.players = []
         self.players_map = {}
         self.sockets_map = {}
+        self.outboxes = {}
+        self.roster_version = 0
         self.all_words = []
-        self.tour_words = []
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.rng = random.Random(self.seed)
+        self.hat = WordHat(rng=random.Random(self.rng.getrandbits(32)))  # hat reseeds its generator
         self.id = str(uuid.uuid4())
-        self.game_name = name or NAMES.get_random_word()
-        self.state = HatGame.ST_SETUP
+        self.game_name = name or NAMES.get_random_word(rng=self.rng)
+        self.__state = HatGame.ST_SETUP
         self.shlyapa = None
         self.num_words = numwords or 6
         self.turn_timer = timer or 20  # in seconds
         self.turn = None
         self.timer = None
-        self.last_event_time = datetime.datetime.now()
+        self.last_event_time = CLOCK.now()
         self.results = None
+        self.score = {}
+        self.tally = []
+        self.score_timer = None
+        self.timer_left = None
+        self.seq = 0
+        self.journal = None
+        self.recording = None
+        self.lock = asyncio.Lock()
+
+    def __getstate__(self):
+        """Game state for snapshot, without connections, timers and journal
+
+        Players are stored as plain tuples and turn pair as their indexes,
+        pickling them as objects costs most of snapshot time
+        """
+        state = self.__dict__.copy()
+        for k in ('players_map', 'sockets_map', 'outboxes', 'timer', 'score_timer', 'journal', 'lock', 'all_words',
+                  'on_change', 'recording', 'rng'):
+            del state[k]
+        state['players'] = [p.__getstate__() for p in self.players]
+        state['timer_left'] = self.timer.remaining() if self.timer else None
+
+        t = self.turn
+        if t is not None:
+            try:
+                state['turn'] = (self.players.index(t.explaining), self.players.index(t.guessing), t)
+            except ValueError:
+                state['turn'] = None  # pair player has left, turn is over anyway
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.players = []
+        for ps in state['players']:
+            p = Player.__new__(Player)
+            p.__setstate__(ps)
+            self.players.append(p)
+        self.all_words = [w for p in self.players for w in p.words]  # only used to fill the hat
+
+        if self.turn is not None:
+            exp, gss, self.turn = self.turn
+            self.turn.explaining, self.turn.guessing = self.players[exp], self.players[gss]
+
+        self.outboxes = {}
+        self.timer = None
+        self.score_timer = None
+        self.journal = None
+        self.recording = None
+        self.on_change = None
+        self.rng = None  # reseeded before each use anyway
+        self.lock = asyncio.Lock()
+        self.last_event_time = CLOCK.now()
+
+        self.players_map = dict([(p.name, p) for p in self.players])
+        self.sockets_map = {}
+        for p in self.players:
+            p.socket = NullSocket()  # until player reconnects
+            self.sockets_map[id(p.socket)] = p
+
+    @property
+    def state(self) -> str:
+        return self.__state
+
+    @state.setter
+    def state(self, state: str):
+        if state != self.__state:
+            self.__state = state
+            self.changed()
+
+    def changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def draw_rng(self) -> random.Random:
+        """Game generator reseeded from game seed and number of events, so draws of game
+        replayed from journal or recording are the same, and generator state is not snapshotted"""
+        if self.rng is None:
+            self.rng = random.Random((self.seed << 32) + self.seq)
+        else:
+            self.rng.seed((self.seed << 32) + self.seq)
+        return self.rng
+
+    def start_journal(self, journal: Optional[EventLog]):
+        """Log game creation, all further events of game go to the same journal"""
+        self.journal = journal
+        self.seq = 0  # creation is first event of game, the same for games journaled since startup
+        self.record('new', name=self.game_name, numwords=self.num_words, timer=self.turn_timer, seed=self.seed)
+
+    def record(self, ev: str, **fields):
+        """Append event to game journal, if any"""
+        self.seq += 1
+        if self.journal is not None:
+            self.journal.append(self.id, self.seq, ev, **fields)
+
+    async def replay(self, event: dict):
+        """Apply event read from journal, timers are not started while replaying"""
+        ev = event['ev']
+        if ev == 'cmd':
+            p = self.players_map.get(event['player'])
+            mcls, cmd = dispatch[event['data']['cmd']]
+            try:
+                await cmd(self, p.socket if p else NullSocket(), mcls.msg(event['data']))
+            except Exception as e:
+                log.debug(f"Replayed command '{event['data']['cmd']}' failed as original one: {e}")
+        elif ev == 'expired':
+            await self.expired()
+        elif ev == 'reset':
+            await self.reset()
+
+        self.cancel_timers()
+        self.timer_left = None  # not known for turn changed after snapshot
+
+    def resume(self):
+        """Restart timer of turn interrupted by restart, with time left when game was
+        snapshotted or full turn time if it is unknown"""
+        if self.state == HatGame.ST_PLAY and self.turn and self.turn.explaining.state == Player.ST_PLAY:
+            timeout = self.turn_timer if self.timer_left is None else self.timer_left
+            self.timer = Timer(timeout, self.expired)
+        self.timer_left = None
 
     def register_player(self, name=None, avatar=None, socket=None) -> bool:
         """Add new player to game"""
         if name in self.players_map:
             p = self.players_map[name]
             del self.sockets_map[id(p.socket)]
+            self.close_outbox(p.socket)
             self.sockets_map[id(socket)] = p
+            self.open_outbox(socket)
             self.players_map[name].socket = socket
             return False
 
         p = Player(name=name, avatar=avatar, socket=socket)
         self.players.append(p)
         self.sockets_map[id(socket)] = p
+        self.open_outbox(socket)
         self.players_map[name] = p
+        self.roster_version += 1
         return True
 
-    async def send_json(self, ws, msg):
-        def dumps(data):
-            return json.dumps(data, ensure_ascii=False)
+    def open_outbox(self, ws):
+        if not isinstance(ws, RemoteSocket):  # queued by outbox of node player is connected to
+            self.outboxes[id(ws)] = Outbox(ws)
 
-        self.last_event_time = datetime.datetime.now()
-        await ws.send_json(msg.data())
+    def close_outbox(self, ws):
+        ob = self.outboxes.pop(id(ws), None)
+        if ob is not None:
+            ob.close()
 
-    async def broadcast(self, msg):
-        """Broadcast message to all players"""
-        for p in self.players:
-            if p.socket is not None:
-                await self.send_json(p.socket, msg)
+    async def flush(self):
+        """Wait until all queued messages are sent out"""
+        await asyncio.gather(*[ob.drain() for ob in self.outboxes.values()])
+
+    def outbox_stats(self) -> dict:
+        """Per-player outbound queue counters"""
+        return dict([(p.name, self.outboxes[id(p.socket)].stats())
+                     for p in self.players if id(p.socket) in self.outboxes])
+
+    async def send_frame(self, ws, frame: str, cmd: str = None):
+        """Send already encoded message
+
+        Frame is queued to outbox if socket is registered in game,
+        otherwise sent directly, giving up on socket stalled longer then settings.SEND_TIMEOUT
+        """
+        if self.recording is not None:
+            self.recording.outbound(ws, frame)
+
+        if isinstance(ws, RemoteSocket):
+            ws.send_frame(frame, cmd)
+            return
+
+        ob = self.outboxes.get(id(ws))
+        if ob is not None:
+            ob.put(cmd, frame)
+            return
+
+        try:
+            await asyncio.wait_for(ws.send_str(frame), settings.SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning(f'Send to {self.sockets_map.get(id(ws))}({id(ws)}) timed out, message dropped')
+
+    async def send_json(self, ws, msg):
+        self.last_event_time = CLOCK.now()
+        await self.send_frame(ws, str(msg), msg.cmd())
+
+    async def broadcast(self, msg, exclude=None):
+        """Broadcast message to all players (except socket `exclude`),
+        message encoded once and sent to all sockets concurrently"""
+        self.last_event_time = CLOCK.now()
+        frame = str(msg)
+        cmd = msg.cmd()
+        sockets = [p.socket for p in self.players if p.socket is not None and p.socket is not exclude]
+
+        results = await asyncio.gather(*[self.send_frame(ws, frame, cmd) for ws in sockets], return_exceptions=True)
+        for ws, r in zip(sockets, results):
+            if isinstance(r, Exception):
+                log.error(f'Broadcast to {self.sockets_map.get(id(ws))}({id(ws)}) failed: {r}')
 
     async def error(self, ws, code, msgtxt):
         """Respond with error and log error"""
@@ -105,25 +310,35 @@ class HatGame:
     async def cmd(self, ws, data):
         """Command multiplexer"""
 
-        global commands
-
-        try:
-            msg = message.ClientMessage.msg(data)
-        except Exception as e:
-            await self.error(ws, 102, f'Invalid message format {data} - {e}')
+        if not isinstance(data, dict) or 'cmd' not in data:
+            await self.error(ws, 102, f'Invalid message format {data} - cmd is not specified')
             return
 
-        cmdtxt = msg.cmd()
-        cmd = getattr(self, cmdtxt, None)
-        if msg.cmd() not in commands or not callable(cmd):
+        cmdtxt = data['cmd']
+        try:
+            mcls, cmd = dispatch[cmdtxt]
+        except (KeyError, TypeError):
             await self.error(ws, 103, f'Unknown command {cmdtxt}')
             return
 
         try:
-            await cmd(ws, msg)
+            msg = mcls.msg(data)
         except Exception as e:
-            log.exception(f"Exception caught while execution of '{cmdtxt}': {e}")
-            await self.error(ws, 104, f"Error executing command '{cmdtxt}': {e}")
+            await self.error(ws, 102, f'Invalid message format {data} - {e}')
+            return
+
+        p = self.sockets_map.get(id(ws))
+        async with self.lock:
+            if self.recording is not None:
+                self.recording.inbound(ws, data)
+            try:
+                await cmd(self, ws, msg)
+            except Exception as e:
+                log.exception(f"Exception caught while execution of '{cmdtxt}': {e}")
+                await self.error(ws, 104, f"Error executing command '{cmdtxt}': {e}")
+            finally:
+                # logged even if failed, replay fails the same way leaving same state
+                self.record('cmd', player=p.name if p else None, data=msg.data())
 
     @handler
     async def name(self, ws, msg: message.Name):
@@ -146,11 +361,17 @@ class HatGame:
         reconnect = not self.register_player(name=name, avatar=msg.avatar, socket=ws)
 
         await self.game(ws)
-        await self.prepare(ws if reconnect else None)  # on reconnect send to self only
+        await self.prepare(ws)  # full snapshot to self only
+
+        if not reconnect:
+            p = self.players_map[name]
+            await self.broadcast(message.Joined(
+                name=p.name, avatar=p.avatar, words=len(p.words), version=self.roster_version), exclude=ws)
 
         if self.state == HatGame.ST_PLAY and self.shlyapa:
             s = self.shlyapa
             await self.send_json(ws, message.Tour(tour=s.get_cur_tour()))
+            await self.send_json(ws, self.scoreboard())
             if self.turn:
                 await self.send_json(ws, message.Turn(
                     turn=s.get_cur_turn(),
@@ -160,15 +381,46 @@ class HatGame:
         if self.state == HatGame.ST_FINISH and self.results is not None:
             await self.send_json(ws, message.Finish(results=self.results))
 
-    def game_msg(self):
+    def game_msg(self, score=False):
         return message.Game(
             id=self.id,
             name=self.game_name,
             numwords=self.num_words,
             timer=self.turn_timer,
-            state=self.state
+            state=self.state,
+            score=self.scoreboard().args() if score and self.state != HatGame.ST_SETUP else None
         )
 
+    def scoreboard(self) -> message.Score:
+        """Live scoreboard, built from incrementally maintained counters"""
+        return message.Score(
+            players=dict([(n, [e + g, e, g]) for n, (e, g) in self.score.items()]),
+            tours=self.tally.copy())
+
+    def score_guessed(self):
+        """Account word explained by current pair, scoreboard push is coalesced for settings.SCORE_INTERVAL"""
+        self.score.setdefault(self.turn.explaining.name, [0, 0])[0] += 1
+        self.score.setdefault(self.turn.guessing.name, [0, 0])[1] += 1
+        self.tally[min(self.shlyapa.get_cur_tour(), len(self.tally) - 1)] += 1
+
+        if self.score_timer is None:
+            self.score_timer = Timer(settings.SCORE_INTERVAL, self.push_score)
+
+    async def push_score(self):
+        self.score_timer = None
+        await self.broadcast(self.scoreboard())
+
+    def cancel_score(self):
+        if self.score_timer:
+            self.score_timer.cancel()
+            self.score_timer = None
+
+    def cancel_timers(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        self.cancel_score()
+
     @handler
     async def game(self, ws):
         """Notify just known Player about Game layout"""
@@ -180,27 +432,30 @@ class HatGame:
         words = msg.words
 
         if len(words) < self.num_words:
+            rng = self.draw_rng()
             for wi in range(0, self.num_words):
-                words.append(NOUNS.get_random_word())
+                words.append(NOUNS.get_random_word(rng=rng))
 
         p = self.sockets_map[id(ws)]
         p.words = words
+        self.roster_version += 1
         log.debug(f'user {p.name} sent words: {words}')
 
-        await self.prepare()
+        await self.broadcast(message.Updated(name=p.name, words=len(words), version=self.roster_version))
 
     @handler
     async def setup(self, ws, msg: message.Setup):
         self.game_name = msg.name or self.game_name
         self.num_words = msg.numwords or self.num_words
         self.turn_timer = msg.timer or self.turn_timer
+        self.changed()
 
         await self.broadcast(self.game_msg())
 
     async def prepare(self, ws=None):
-        """Notify All Players about changed set of players"""
+        """Send full snapshot of players to one player or to all of them"""
         players = dict([(p.name, message.UserInfo(len(p.words), p.avatar)) for p in self.players])
-        msg = message.Prepare(players=players)
+        msg = message.Prepare(players=players, version=self.roster_version)
 
         if ws is not None:
             await self.send_json(ws, msg)
@@ -219,6 +474,7 @@ class HatGame:
             return
 
         self.all_words = [w for p in self.players for w in p.words]
+        self.hat.fill(self.all_words)
         cfg = Config(
             number_players=len(self.players),
             number_words=len(self.all_words),
@@ -227,6 +483,8 @@ class HatGame:
 
         self.shlyapa = Shlyapa(config=cfg)
         self.state = HatGame.ST_PLAY
+        self.score = dict([(p.name, [0, 0]) for p in self.players])
+        self.tally = [0] * cfg.number_tours
 
         await self.tour()
         await self.next_move()
@@ -238,27 +496,23 @@ class HatGame:
 
     async def tour(self):
         """Notify All Players about tour start, happens at begin of each tour"""
-        self.tour_words = self.all_words.copy()
+        self.hat.reset()
         await self.broadcast(message.Tour(tour=self.shlyapa.get_cur_tour()))
         log.debug(f"Next tour {self.shlyapa.get_cur_tour()}")
-        log.debug(f"Words #{len(self.tour_words)}: {self.tour_words}")
+        log.debug(f"Words #{len(self.hat)}: {list(self.hat)}")
 
     async def finish(self, s: Shlyapa):
         def player_array_to_dict(score_list):
             pn = len(self.players)
             return dict([(self.players[i].name, v) for i, v in enumerate(score_list) if i < pn])
 
-        s.calculate_results()
-        total_score = player_array_to_dict(s.get_total_score_results())
-        explained_score = player_array_to_dict(s.get_explained_score_results())
-        guessed_score = player_array_to_dict(s.get_guessed_score_results())
-
         score = {}
-        for p in self.players:
+        for i, p in enumerate(self.players):
+            total, explained, guessed = s.get_score_results(i)  # kept up to date by each move
             score[p.name] = {
-                "total": total_score[p.name],
-                "explained": explained_score[p.name],
-                "guessed": guessed_score[p.name]
+                "total": total,
+                "explained": explained,
+                "guessed": guessed
             }
 
         self.results = {
@@ -267,6 +521,7 @@ class HatGame:
             "guessed": [player_array_to_dict(t) for t in s.get_guessed_table_results()]
         }
 
+        self.cancel_score()
         await self.broadcast(message.Finish(results=self.results))
         self.state = HatGame.ST_FINISH
 
@@ -289,7 +544,7 @@ class HatGame:
             missed_words = self.turn.missed_words
             if len(missed_words):
                 log.debug(f"Return #{len(missed_words)} words to hat")
-                self.tour_words.extend(missed_words)
+            self.hat.put_back(missed_words)
 
         s = self.shlyapa
 
@@ -311,7 +566,7 @@ class HatGame:
         gss = self.players[pair_idx.guessing]
         self.turn = Turn(explaining=exp, guessing=gss)
 
-        log.debug(f'In hat #{len(self.tour_words)}')
+        log.debug(f'In hat #{len(self.hat)}')
         log.debug(f'Pair selected: explain={exp} guessing={gss}')
         exp.begin()  # noqa
         gss.begin()  # noqa
@@ -320,13 +575,11 @@ class HatGame:
         await self.broadcast(m)
 
     def has_words(self):
-        return len(self.tour_words) > 0
+        return len(self.hat) > 0
 
     async def next_word(self):
         """Select next word for pair"""
-        if len(self.tour_words) == 0:
-            raise ValueError("No more words - unexpected")
-        self.turn.word = self.tour_words.pop(random.randrange(0, len(self.tour_words)))
+        self.turn.word = self.hat.draw()
 
         m = message.Next(word=self.turn.word)
         await self.send_json(self.turn.explaining.socket, m)
@@ -372,6 +625,7 @@ class HatGame:
 
         self.turn.guessed(result=msg.guessed)
         if msg.guessed:
+            self.score_guessed()
             m = message.Explained(word=self.turn.word)
         else:
             m = message.Missed()
@@ -405,23 +659,26 @@ class HatGame:
 
     async def expired(self):
         """Guessing time expired"""
-        self.timer = None
+        async with self.lock:
+            self.timer = None
+            self.record('expired')
 
-        try:
-            log.debug('Turn timer expired, stop turn')
+            try:
+                log.debug('Turn timer expired, stop turn')
 
-            await self.broadcast(message.Stop(reason='timer'))
+                await self.broadcast(message.Stop(reason='timer'))
 
-            self.turn.explaining.lastanswer()
-            self.turn.guessing.finish()
-        except Exception as e:
-            log.error(f'Exception while process timer: {e}')
-            log.exception()
+                self.turn.explaining.lastanswer()
+                self.turn.guessing.finish()
+            except Exception as e:
+                log.error(f'Exception while process timer: {e}')
+                log.exception()
 
     @handler
     async def close(self, ws, msg: message.Close = None):
         """Close connection, exit user"""
         p = self.sockets_map.pop(id(ws), None)
+        self.close_outbox(ws)
         if p:
             self.players_map.pop(p.name, None)
             if p in self.players:
@@ -442,21 +699,24 @@ class HatGame:
 
             p.socket = None
 
+            self.roster_version += 1
+            await self.broadcast(message.Left(name=p.name, version=self.roster_version))
+
             pn = len(self.players)
-            if pn > 2:
+            if pn > 2 and self.shlyapa:
                 self.shlyapa.config.set_number_players(pn)
 
     def reinit(self):
-        if self.timer:
-            self.timer.cancel()
+        self.cancel_timers()
 
         self.all_words = []
-        self.tour_words = []
+        self.hat.fill([])
         self.state = HatGame.ST_SETUP
         self.shlyapa = None
         self.turn = None
-        self.timer = None
         self.results = None
+        self.score = {}
+        self.tally = []
 
     @handler
     async def restart(self, ws, msg: message.Restart):
@@ -469,9 +729,10 @@ class HatGame:
 
         for p in self.players:
             p.reset()
+        self.roster_version += 1
 
         await self.broadcast(self.game_msg())
-        await self.prepare()
+        await self.prepare()  # words of all players were reset - full snapshot
 
     @handler
     async def reset(self, ws=None, msg: message.Restart = None):
@@ -490,6 +751,7 @@ class HatGame:
 
             del self.sockets_map[id(p.socket)]
             del self.players_map[p.name]
+            self.close_outbox(p.socket)
 
             await p.socket.close()
 
@@ -497,5 +759,11 @@ class HatGame:
             self.players.append(me)
 
         self.reinit()
+        self.roster_version += 1
 
         log.info(f'Game was reset{f" by {me}" if me else ""}')
+
+
+# wire cmd -> (client message class, handler), commands are dispatched through this table only
+dispatch = dict([(cmd, (mcls, commands[cmd]))
+                 for cmd, mcls in message.ClientMessage.registry.items() if cmd in commands])
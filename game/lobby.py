@@ -0,0 +1,186 @@
+import asyncio
+from itertools import islice
+import json
+from typing import (Dict, List, Optional)
+
+import aiohttp
+
+import settings
+from settings import log
+from . import message
+from .cluster import (Cluster, FORWARDED)
+from .metrics import METRICS
+from .outbox import Outbox
+from .registry import GameRegistry
+
+
+class Subscriber:
+    __slots__ = ('outbox', 'pending', 'local')
+
+    outbox: Outbox
+    pending: Dict[str, None]  # IDs of changed games not sent yet, in order of change
+    local: bool  # other worker of cluster, gets games of this worker only
+
+    def __init__(self, outbox: Outbox, local: bool = False):
+        self.outbox = outbox
+        self.pending = {}
+        self.local = local
+
+
+class Lobby:
+    """Subscribers to list of games, replaces polling of GET /games
+
+    Subscriber gets Lobby message with all games, then Game message for each created
+    or changed game and Expire message for each removed one. Changes are collected
+    for `interval` seconds, burst of changes of one game is sent once with its latest
+    state. Subscriber gets at most `rate` messages per second, the rest waits for next
+    rounds; subscriber which does not read even these is disconnected
+
+    In cluster, lobby follows lobbies of other workers since its first subscriber,
+    their games are sent to subscribers along with own ones
+    """
+
+    RETRY = 1.0  # seconds before reconnecting to other worker
+
+    games: GameRegistry
+    cluster: Optional[Cluster]
+    interval: float
+    rate: int
+    subscribers: Dict[int, Subscriber]
+    __changed: Dict[str, None]
+    __handle: Optional[asyncio.TimerHandle]
+    __remote: Dict[int, Dict[str, dict]]  # worker -> game ID -> Game message data of its games
+    __feeds: List[asyncio.Future]
+
+    def __init__(self, games: GameRegistry, interval: float = None, rate: int = None, cluster: Cluster = None):
+        self.games = games
+        self.cluster = cluster
+        self.interval = interval or settings.LOBBY_INTERVAL
+        self.rate = rate or settings.LOBBY_RATE
+        self.subscribers = {}
+        self.__changed = {}
+        self.__handle = None
+        self.__remote = {}
+        self.__feeds = []
+        games.on_change = self.changed
+
+    def subscribe(self, ws, local: bool = False) -> Outbox:
+        """Send snapshot of games to websocket and start sending changes to it
+
+        `local` subscriber is other worker, it gets games of this worker only
+        """
+        games = [g.game_msg().args() for g in self.games.values()]
+        if not local:
+            self.__follow()
+            games.extend(args for remote in self.__remote.values() for args in remote.values())
+
+        ob = Outbox(ws, policy=Outbox.POLICY_DISCONNECT)
+        ob.put('lobby', str(message.Lobby(games=games)))
+        self.subscribers[id(ws)] = Subscriber(ob, local)
+        log.debug(f'Lobby subscriber {id(ws)}, {len(self.subscribers)} total')
+        return ob
+
+    def unsubscribe(self, ws):
+        sub = self.subscribers.pop(id(ws), None)
+        if sub is not None:
+            sub.outbox.close()
+
+    def changed(self, gid: str):
+        if not self.subscribers:
+            return  # new subscriber gets snapshot anyway
+
+        self.__changed[gid] = None
+        self.__schedule()
+
+    def __schedule(self):
+        if self.__handle is None:
+            self.__handle = asyncio.get_event_loop().call_later(self.interval, self.__flush)
+
+    def __follow(self):
+        if self.cluster is not None and not self.__feeds:
+            self.__feeds = [asyncio.ensure_future(self.__feed(i))
+                            for i in range(self.cluster.workers) if i != self.cluster.worker]
+
+    async def __feed(self, worker: int):
+        """Keep games of other worker up to date by subscribing to its lobby"""
+        remote = self.__remote.setdefault(worker, {})
+        url = self.cluster.peers[worker] + '/lobby'
+        while True:
+            try:
+                async with self.cluster.session.ws_connect(url, headers={FORWARDED: str(self.cluster.worker)}) as ws:
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        self.__relay(remote, json.loads(msg.data))
+            except aiohttp.ClientError as e:
+                log.error(f'Lobby of worker {worker} failed: {e}')
+
+            # not known until reconnected, snapshot brings them back
+            for gid in list(remote):
+                del remote[gid]
+                self.changed(gid)
+            await asyncio.sleep(Lobby.RETRY)
+
+    def __relay(self, remote: Dict[str, dict], data: dict):
+        cmd = data.pop('cmd', None)
+        if cmd == 'lobby':
+            games = data['games']
+        elif cmd == 'game':
+            games = [data]
+        elif cmd == 'expire':
+            remote.pop(data['id'], None)
+            self.changed(data['id'])
+            return
+        else:
+            return
+
+        for args in games:
+            remote[args['id']] = args
+            self.changed(args['id'])
+
+    def __frame(self, gid: str):
+        game = self.games.get(gid)
+        if game is not None:
+            return 'game', str(game.game_msg())
+        if self.cluster is not None:
+            args = self.__remote.get(self.cluster.owner(gid), {}).get(gid)
+            if args is not None:
+                return 'game', str(message.Game(**args))
+        return 'expire', str(message.Expire(id=gid))
+
+    def __flush(self):
+        self.__handle = None
+        changed, self.__changed = self.__changed, {}
+        budget = max(1, int(self.rate * self.interval))
+        frames = {}  # encoded once for all subscribers
+        backlog = False
+        own = changed if self.cluster is None else dict((gid, None) for gid in changed if self.cluster.owns(gid))
+
+        for wid, sub in list(self.subscribers.items()):
+            if sub.outbox.closed:
+                del self.subscribers[wid]
+                continue
+
+            sub.pending.update(own if sub.local else changed)
+            for gid in list(islice(sub.pending, budget)):
+                del sub.pending[gid]
+                if gid not in frames:
+                    frames[gid] = self.__frame(gid)
+                sub.outbox.put(*frames[gid])
+                METRICS.count('lobby_events')
+
+            backlog = backlog or bool(sub.pending)
+
+        if backlog:
+            self.__schedule()
+
+    def close(self):
+        for f in self.__feeds:
+            f.cancel()
+        self.__feeds = []
+        if self.__handle is not None:
+            self.__handle.cancel()
+            self.__handle = None
+        for sub in self.subscribers.values():
+            sub.outbox.close()
+        self.subscribers = {}
@@ -1,67 +1,101 @@
-from abc import ABC
+from abc import (ABC, ABCMeta)
 import json
-import sys
 
-from typing import (List, Dict, get_type_hints, Any, Optional, NamedTuple)
+from typing import (List, Dict, get_type_hints, get_origin, get_args, Any, Optional, NamedTuple, Union)
 
+_encode = json.JSONEncoder(ensure_ascii=False).encode
 
-class Message(ABC):
+
+class MessageMeta(ABCMeta):
+    """Compiles message schema (fields, validators, cmd) once, when message class is defined
+
+    Abstract message classes (direct ABC descendants) get registry of concrete
+    message classes keyed by wire cmd. Optional fields set to None are not sent to wire
+    """
+
+    def __new__(mcls, name, bases, namespace, **kwargs):
+        namespace.setdefault('__slots__', tuple(namespace.get('__annotations__', {})))
+        cls = super().__new__(mcls, name, bases, namespace, **kwargs)
+
+        hints = get_type_hints(cls)
+        cls._fields = tuple(hints)
+        cls._validators = tuple(
+            (pn, get_origin(t)) for pn, t in hints.items() if get_origin(t) in (list, dict))
+        cls._optional = frozenset(
+            pn for pn, t in hints.items() if get_origin(t) is Union and type(None) in get_args(t))
+        cls._cmd = name.lower()
+
+        if ABC in bases:
+            cls.registry = {}
+        else:
+            for base in cls.__mro__[1:]:
+                if ABC in base.__bases__:
+                    base.registry[cls._cmd] = cls
+
+        return cls
+
+
+class Message(ABC, metaclass=MessageMeta):
     """API Base Message, abstract class"""
 
     def __init__(self, **kwargs):
-        for pn in self._get_attributes():
-            if pn in kwargs:
-                setattr(self, pn, kwargs[pn])
+        for pn in self._fields:
+            setattr(self, pn, kwargs.get(pn))
+
+        for pn, t in self._validators:
+            v = getattr(self, pn)
+            if v is not None and not isinstance(v, t):
+                raise ValueError(f"{pn} attribute should be {'an array' if t is list else 'an object'}")
 
     def __str__(self):
-        return json.dumps(self.data(), ensure_ascii=False)
+        return _encode(self.data())
+
+    def to_json_bytes(self) -> bytes:
+        return _encode(self.data()).encode()
 
     def __eq__(self, other):
         return type(self) == type(other) and \
-            all(getattr(self, p) == getattr(other, p) for p in self._get_attributes())
+            all(getattr(self, p) == getattr(other, p) for p in self._fields)
 
     def __ne__(self, other):
         return not self == other
 
     @classmethod
     def msg(cls, data):
-        data = data.copy()
         if ABC in cls.__bases__:
             if 'cmd' not in data:
                 raise ValueError('cmd is not specified')
             cmd = data['cmd']
-            mcls = getattr(sys.modules[__name__], cmd.title(), None)
+            mcls = cls.registry.get(cmd) if isinstance(cmd, str) else None
 
-            if mcls is None or not issubclass(mcls, cls):
+            if mcls is None:
                 raise ValueError(f"Unknown command '{cmd}'")
-
-            del data['cmd']
         else:
             if 'cmd' in data:
                 cmd = data['cmd']
-                if cls.__name__.lower() != cmd:
+                if cls._cmd != cmd:
                     raise ValueError(f"Sent command '{cmd}' does not match required class {cls.__name__}")
-
-                del data['cmd']
             mcls = cls
 
-        return mcls(**data)  # noqa
-
-    def _get_attributes(self):
-        return [p for p in get_type_hints(self.__class__)]
+        return mcls(**{k: v for k, v in data.items() if k != 'cmd'})  # noqa
 
     def args(self):
+        """Fields as sent to wire, without cmd"""
+        if not self._optional:
+            return {pn: getattr(self, pn) for pn in self._fields}
+
         ret = {}
-        for pn in self._get_attributes():
-            ret[pn] = getattr(self, pn)
+        for pn in self._fields:
+            v = getattr(self, pn)
+            if v is not None or pn not in self._optional:
+                ret[pn] = v
         return ret
 
     def data(self):
-        ret = {'cmd': self.cmd(), **self.args()}
-        return ret
+        return {'cmd': self._cmd, **self.args()}
 
     def cmd(self):
-        return self.__class__.__name__.lower()
+        return self._cmd
 
 
 class ClientMessage(Message, ABC):
@@ -84,9 +118,10 @@ class Newgame(ClientMessage):
     name: str
     numwords: int
     timer: int
+    seed: Optional[int]  # of words draws, to replay recorded game
 
-    def __init__(self, name=None, numwords=None, timer=None):
-        super().__init__(name=name, numwords=numwords, timer=timer)
+    def __init__(self, name=None, numwords=None, timer=None, seed=None):
+        super().__init__(name=name, numwords=numwords, timer=timer, seed=seed)
 
 
 class Name(ClientMessage):
@@ -171,9 +206,26 @@ class Game(ServerMessage):
     numwords: int
     timer: int
     state: str
+    score: Optional[dict]  # live scoreboard, see Score, sent on request only
+
+    def __init__(self, id=None, name=None, numwords=None, timer=None, state=None, score=None):
+        super().__init__(id=id, name=name, numwords=numwords, timer=timer, state=state, score=score)
+
+
+class Lobby(ServerMessage):
+    """List of games sent to lobby subscriber first, followed by Game and Expire changes"""
+    games: List[dict]  # Game messages data, without cmd
+
+    def __init__(self, games=None):
+        super().__init__(games=games)
+
 
-    def __init__(self, id=None, name=None, numwords=None, timer=None, state=None):
-        super().__init__(id=id, name=name, numwords=numwords, timer=timer, state=state)
+class Expire(ServerMessage):
+    """Game is removed from lobby"""
+    id: str
+
+    def __init__(self, id=None):
+        super().__init__(id=id)
 
 
 class UserInfo(NamedTuple):
@@ -182,12 +234,13 @@ class UserInfo(NamedTuple):
 
 
 class Prepare(ServerMessage):
-    """Notify everybody about who is joined to game"""
+    """Full snapshot of players joined to game, sent on first join or on reconnect"""
 
     players: Dict[str, UserInfo]
+    version: int  # roster version, see Joined/Left/Updated
 
-    def __init__(self, players: Dict[str, Any]=None):
-        super(Prepare, self).__init__()
+    def __init__(self, players: Dict[str, Any]=None, version=None):
+        super(Prepare, self).__init__(version=version)
         self.players = {}
         for k, v in players.items():
             if isinstance(v, list):
@@ -195,6 +248,39 @@ class Prepare(ServerMessage):
             self.players[k] = v
 
 
+class Joined(ServerMessage):
+    """Roster delta - player joined to game"""
+
+    name: str
+    avatar: str
+    words: int
+    version: int
+
+    def __init__(self, name=None, avatar=None, words=None, version=None):
+        super().__init__(name=name, avatar=avatar, words=words, version=version)
+
+
+class Left(ServerMessage):
+    """Roster delta - player left game"""
+
+    name: str
+    version: int
+
+    def __init__(self, name=None, version=None):
+        super().__init__(name=name, version=version)
+
+
+class Updated(ServerMessage):
+    """Roster delta - player's number of words changed"""
+
+    name: str
+    words: int
+    version: int
+
+    def __init__(self, name=None, words=None, version=None):
+        super().__init__(name=name, words=words, version=version)
+
+
 class Wait(ServerMessage):
     """Response on attempt to start game when not all players set words"""
     pass
@@ -257,6 +343,16 @@ class Stop(ServerMessage):
         super().__init__(reason=reason)
 
 
+class Score(ServerMessage):
+    """Live scoreboard: {player: [total, explained, guessed]} and words explained in each tour"""
+
+    players: Dict[str, List[int]]
+    tours: List[int]
+
+    def __init__(self, players=None, tours=None):
+        super().__init__(players=players, tours=tours)
+
+
 class Finish(ServerMessage):
     """Game is finished"""
 
@@ -271,7 +367,12 @@ if __name__ == '__main__':
 
     server_messages = [
         Game(id="xxxx-id-here", name='Secret Tea', numwords=10, timer=20, state='setup'),
-        Prepare(players={"user1": [5, "//"], "user2": [0, "//"], "user3": [6, "//"]}),
+        Lobby(games=[{"id": "xxxx-id-here", "name": "Secret Tea", "numwords": 10, "timer": 20, "state": "setup"}]),
+        Expire(id="xxxx-id-here"),
+        Prepare(players={"user1": [5, "//"], "user2": [0, "//"], "user3": [6, "//"]}, version=3),
+        Joined(name="user4", avatar="//", words=0, version=4),
+        Updated(name="user4", words=6, version=5),
+        Left(name="user2", version=6),
         Wait(),
         Tour(tour=1),
         Turn(turn=10, explain="user1", guess="user2"),
@@ -279,6 +380,7 @@ if __name__ == '__main__':
         Next(word="banana"),
         Explained(word="banana"),
         Missed(),
+        Score(players={"user1": [3, 2, 1], "user2": [3, 1, 2]}, tours=[3, 0, 0]),
         Error(code=123, message='The Error Message')
     ]
 
@@ -0,0 +1,128 @@
+from bisect import bisect_left
+from typing import (Dict, List)
+
+# latency histogram bucket upper bounds, in milliseconds
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf'))
+
+
+class Histogram:
+    """Fixed buckets latency histogram"""
+
+    counts: List[int]
+    count: int
+    total: float
+    max: float
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def merge(self, other: 'Histogram') -> None:
+        """Add observations of other histogram, e.g. collected by other process"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of bucket holding q-th percentile (0 < q <= 1)"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for le, c in zip(BUCKETS, self.counts):
+            seen += c
+            if seen >= rank:
+                return min(le, self.max)
+
+        return self.max
+
+    def data(self) -> dict:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 3),
+            'max_ms': round(self.max, 3),
+            'p50_ms': round(self.percentile(0.5), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'p99_ms': round(self.percentile(0.99), 3),
+            'buckets': dict([(str(le), c) for le, c in zip(BUCKETS, self.counts) if c]),
+        }
+
+
+class CommandStats:
+    calls: int
+    errors: int
+    latency: Histogram
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.latency.observe(seconds * 1000)
+
+    def data(self) -> dict:
+        return {'calls': self.calls, 'errors': self.errors, 'latency': self.latency.data()}
+
+
+class Metrics:
+    """Process-wide counters, aggregated across all games"""
+
+    commands: Dict[str, CommandStats]
+    timers: Dict[str, Histogram]
+    counters: Dict[str, int]
+
+    def __init__(self):
+        self.commands = {}
+        self.timers = {}
+        self.counters = {}
+
+    def command(self, name: str) -> CommandStats:
+        try:
+            return self.commands[name]
+        except KeyError:
+            cs = self.commands[name] = CommandStats()
+            return cs
+
+    def timer(self, name: str) -> Histogram:
+        try:
+            return self.timers[name]
+        except KeyError:
+            h = self.timers[name] = Histogram()
+            return h
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self) -> None:
+        for cs in self.commands.values():
+            cs.reset()
+        self.timers = {}
+        self.counters = {}
+
+    def data(self) -> dict:
+        return {
+            'commands': dict([(n, cs.data()) for n, cs in sorted(self.commands.items())]),
+            'timers': dict([(n, h.data()) for n, h in sorted(self.timers.items())]),
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+
+METRICS = Metrics()
@@ -0,0 +1,160 @@
+import asyncio
+from collections import deque
+from typing import (Deque, Optional, Tuple)
+
+import settings
+from settings import log
+
+
+class Outbox:
+    """Bounded outbound queue of one socket, drained by its own writer task"""
+
+    POLICY_DROP = 'drop'              # drop state message superseded by the new one, disconnect if there is none
+    POLICY_DISCONNECT = 'disconnect'  # disconnect slow consumer at once
+    POLICY_LAG = 'lag'                # mark consumer as lagging, keep all its messages
+
+    # state messages which make older queued message of the same cmd useless
+    SUPERSEDABLE = ('game', 'prepare', 'tour', 'turn')
+
+    ws = None
+    size: int
+    policy: str
+    sent: int
+    dropped: int
+    max_depth: int
+    lagging: bool
+    closed: bool
+    __queue: Deque[Tuple[str, str]]
+    __task: Optional[asyncio.Task]
+    __wakeup: Optional[asyncio.Event]
+    __idle: Optional[asyncio.Event]
+
+    def __init__(self, ws, size=None, policy=None):
+        self.ws = ws
+        self.size = size or settings.OUTBOX_SIZE
+        self.policy = policy or settings.OUTBOX_POLICY
+        if self.policy not in (Outbox.POLICY_DROP, Outbox.POLICY_DISCONNECT, Outbox.POLICY_LAG):
+            raise ValueError(f"Unknown outbox overflow policy '{self.policy}'")
+
+        self.sent = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.lagging = False
+        self.closed = False
+        self.__queue = deque()
+        self.__task = None
+        self.__wakeup = None
+        self.__idle = None
+
+    def __len__(self):
+        return len(self.__queue)
+
+    def put(self, cmd: str, frame: str) -> bool:
+        """Enqueue encoded message, never blocks, returns False if message was not queued"""
+        if self.closed:
+            return False
+
+        if self.__task is None:
+            self.__wakeup = asyncio.Event()
+            self.__idle = asyncio.Event()
+            self.__task = asyncio.ensure_future(self.__writer())
+
+        if len(self.__queue) >= self.size and not self.__overflow(cmd):
+            return False
+
+        self.__queue.append((cmd, frame))
+        self.max_depth = max(self.max_depth, len(self.__queue))
+        self.__idle.clear()
+        self.__wakeup.set()
+        return True
+
+    def __overflow(self, cmd: str) -> bool:
+        """Apply overflow policy, returns True if new message still may be queued"""
+        if self.policy == Outbox.POLICY_DISCONNECT:
+            self.disconnect('outbox overflow')
+            return False
+
+        if self.policy == Outbox.POLICY_LAG:
+            if not self.lagging:
+                log.warning(f'Socket {id(self.ws)} is lagging, {len(self.__queue)} messages queued')
+                self.lagging = True
+            return True
+
+        if self.__drop_superseded(cmd):
+            return True
+
+        self.disconnect('outbox overflow, nothing to drop')
+        return False
+
+    def __drop_superseded(self, cmd: str) -> bool:
+        """Drop queued message of the same cmd as the new one, if the new one supersedes it
+
+        Messages of other cmd are never dropped: client would miss Tour/Turn it never gets
+        again, or roster snapshot following Joined/Updated/Left deltas apply to
+        """
+        if cmd not in Outbox.SUPERSEDABLE:
+            return False
+
+        for i, (qcmd, _) in enumerate(self.__queue):
+            if qcmd == cmd:
+                del self.__queue[i]
+                self.dropped += 1
+                return True
+
+        return False
+
+    async def __writer(self):
+        while True:
+            while not self.__queue:
+                self.lagging = False
+                self.__idle.set()
+                self.__wakeup.clear()
+                await self.__wakeup.wait()
+
+            cmd, frame = self.__queue.popleft()
+            try:
+                await asyncio.wait_for(self.ws.send_str(frame), settings.SEND_TIMEOUT)
+                self.sent += 1
+            except asyncio.TimeoutError:
+                log.warning(f"Send '{cmd}' to {id(self.ws)} timed out, message dropped")
+                self.dropped += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Send '{cmd}' to {id(self.ws)} failed: {e}")
+                self.dropped += 1
+
+    async def drain(self):
+        """Wait until all queued messages are sent"""
+        if self.__idle is not None and not self.closed:
+            await self.__idle.wait()
+
+    def disconnect(self, reason):
+        """Drop slow consumer"""
+        log.warning(f'Disconnect socket {id(self.ws)}: {reason}')
+        self.dropped += len(self.__queue)
+        self.close()
+
+        try:
+            asyncio.ensure_future(self.ws.close())
+        except Exception:
+            pass
+
+    def close(self):
+        """Stop writer, queued messages are discarded"""
+        self.closed = True
+        self.__queue.clear()
+        if self.__task is not None:
+            self.__task.cancel()
+        if self.__idle is not None:
+            self.__idle.set()
+
+    def stats(self) -> dict:
+        return {
+            'depth': len(self.__queue),
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'lagging': self.lagging,
+            'closed': self.closed,
+        }
@@ -1,16 +1,19 @@
 from settings import log
 
-from transitions import Machine
-from typing import (List, Optional)
+from typing import (Callable, Dict, List, Optional)
+
+
+class MachineError(Exception):
+    """Transition is not allowed from current state"""
 
 
 class Player:
+    __slots__ = ('state', 'socket', '__name', '__avatar', '__words')
+
     state: str
-    socket = None
-    __name: Optional[str] = None
-    __avatar: Optional[str] = None
+    __name: Optional[str]
+    __avatar: Optional[str]
     __words: List[str]
-    __machine: Machine
 
     ST_UNKNOWN = 'unknown'         # Just connected - unknown
     ST_WORDS = 'words'             # Waiting for words from player
@@ -21,6 +24,11 @@ class Player:
     ST_LAST_ANSWER = 'lastanswer'  # Waiting for last explanation results (time is out)
     ST_FINISH = 'finish'           # Finishing turn
 
+    STATES = (ST_UNKNOWN, ST_WORDS, ST_WAIT, ST_BEGIN, ST_READY, ST_PLAY, ST_LAST_ANSWER, ST_FINISH)
+
+    # trigger -> {source state -> destination state}, compiled once by compile_transitions()
+    TRANSITIONS: Dict[str, Dict[str, str]] = {}
+
     def __init__(self, name=None, avatar=None, socket=None):
         self.state = Player.ST_UNKNOWN
         self.socket = socket
@@ -28,7 +36,12 @@ class Player:
         self.__avatar = avatar
         self.__words = []
 
-        states = [v for k, v in Player.__dict__.items() if k.startswith('ST_')]
+        if self.__name:
+            self.waitwords()
+
+    @staticmethod
+    def compile_transitions():
+        """Build shared transitions table and trigger methods"""
         transitions = [
             ['waitwords',  Player.ST_UNKNOWN,     Player.ST_WORDS      ],  # noqa
             ['wait',       Player.ST_WORDS,       Player.ST_WAIT       ],  # noqa
@@ -42,17 +55,30 @@ class Player:
             ['finish',     Player.ST_LAST_ANSWER, Player.ST_FINISH     ],  # noqa
             ['reset',      '*',                   Player.ST_WORDS      ],  # noqa
         ]
-        self.__machine = Machine(model=self, states=states, initial=Player.ST_UNKNOWN)
-        for t in transitions:
-            self.__machine.add_transition(
-                trigger=t[0],
-                source=t[1],
-                dest=t[2],
-                after='log'
-            )
 
-        if self.__name:
-            self.waitwords()
+        table = {}
+        for trigger, source, dest in transitions:
+            sources = Player.STATES if source == '*' else (source,)
+            table.setdefault(trigger, {}).update(dict([(s, dest) for s in sources]))
+
+        Player.TRANSITIONS = table
+        for trigger in table:
+            setattr(Player, trigger, Player.__trigger(trigger, table[trigger]))
+
+    @staticmethod
+    def __trigger(trigger: str, table: Dict[str, str]):
+        def fire(self) -> bool:
+            try:
+                self.state = table[self.state]
+            except KeyError:
+                raise MachineError(f"Can't trigger event {trigger} from state {self.state}!")
+
+            if Player.after is not None:
+                Player.after(self)
+            return True
+
+        fire.__name__ = trigger
+        return fire
 
     @property
     def name(self):
@@ -72,6 +98,9 @@ class Player:
     def log(self):
         log.debug(f'Player {self.name} status changed to {self.state}')
 
+    # called after each transition, set to None to disable
+    after: Optional[Callable[['Player'], None]] = log
+
     @property
     def words(self):
         return self.__words
@@ -83,5 +112,16 @@ class Player:
         self.__words = words
         self.wait()
 
+    def __getstate__(self):
+        """Socket is not a part of player state"""
+        return self.state, self.__name, self.__avatar, self.__words
+
+    def __setstate__(self, state):
+        self.state, self.__name, self.__avatar, self.__words = state
+        self.socket = None
+
     def __str__(self):
         return self.name
+
+
+Player.compile_transitions()
@@ -0,0 +1,117 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import itertools
+import json
+import os
+import time
+from typing import (Iterator, List, Tuple)
+import weakref
+
+from settings import log
+
+# time driven messages, depend on speed of players rather than on their commands
+TIMED = ('score',)
+
+
+class Recording:
+    """Commands of game players and frames sent to them, for replay against other build
+
+    File is gzipped JSON lines: header with game settings, then
+        ["<", ms, conn, data]   command received from connection
+        [">", ms, conn, frame]  frame sent to connection
+    where ms is time since game creation and conn is number of connection in game.
+    Lines are buffered and appended to file as gzip members by writer thread of Recorder,
+    file is not kept open
+    """
+
+    FLUSH_LINES = 256
+
+    path: str
+    __executor: ThreadPoolExecutor
+    __started: float
+    __conns: weakref.WeakKeyDictionary  # ws -> connection number, id() of closed one is reused
+    __numbers: Iterator[int]
+    __lines: List[str]
+
+    def __init__(self, path: str, header: dict, executor: ThreadPoolExecutor):
+        self.path = path
+        self.__executor = executor
+        self.__started = time.perf_counter()
+        self.__conns = weakref.WeakKeyDictionary()
+        self.__numbers = itertools.count()
+        self.__lines = [json.dumps(header, ensure_ascii=False)]
+
+    def conn(self, ws) -> int:
+        try:
+            return self.__conns[ws]
+        except KeyError:
+            n = self.__conns[ws] = next(self.__numbers)
+            return n
+
+    def __add(self, kind: str, ws, payload):
+        ms = round((time.perf_counter() - self.__started) * 1000, 1)
+        self.__lines.append(json.dumps([kind, ms, self.conn(ws), payload], ensure_ascii=False))
+        if len(self.__lines) >= Recording.FLUSH_LINES:
+            self.__flush()
+
+    def inbound(self, ws, data: dict):
+        self.__add('<', ws, data)
+
+    def outbound(self, ws, frame: str):
+        self.__add('>', ws, frame)
+
+    def __flush(self):
+        if self.__lines:
+            lines, self.__lines = self.__lines, []
+            asyncio.get_event_loop().run_in_executor(self.__executor, self.__write, lines)
+
+    def __write(self, lines: List[str]):
+        """Writer thread: append batch to file"""
+        try:
+            with gzip.open(self.path, 'at', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        except OSError as e:
+            log.error(f'Recording {self.path} write failed, {len(lines)} lines lost: {e}')
+
+    async def flush(self):
+        """Write out buffered lines and wait until they are in file"""
+        self.__flush()
+        await asyncio.get_event_loop().run_in_executor(self.__executor, lambda: None)
+
+
+class Recorder:
+    """Records all games created by process, one file per game in directory `path`,
+    files are written by one thread shared by all recordings"""
+
+    path: str
+    __executor: ThreadPoolExecutor
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recorder')
+
+    def file(self, gid: str) -> str:
+        return os.path.join(self.path, f'{gid}.rec.gz')
+
+    def start(self, game):
+        game.recording = Recording(self.file(game.id), header={
+            'id': game.id,
+            'name': game.game_name,
+            'numwords': game.num_words,
+            'timer': game.turn_timer,
+            'seed': game.seed,
+            'seq': game.seq,
+            'created': time.time(),
+        }, executor=self.__executor)
+
+    def close(self):
+        self.__executor.shutdown()
+
+
+def read(path: str) -> Tuple[dict, list]:
+    """Header and events of recording"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        return header, [json.loads(line) for line in f if line.strip()]
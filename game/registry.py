@@ -0,0 +1,173 @@
+import hashlib
+import json
+from bisect import bisect_right
+from itertools import islice
+from collections.abc import MutableMapping
+from typing import (Callable, Dict, List, Optional, Set, Tuple)
+
+from .metrics import METRICS
+
+
+def normalize(name: Optional[str]) -> str:
+    return (name or '').strip().lower()
+
+
+class GameRegistry(MutableMapping):
+    """Games by ID, indexed by normalized name and by state
+
+    Games are listed in order they were added, page cursor is sequence number
+    of the last listed game. Encoded pages are cached until any listed data
+    changes: game is added, removed, set up or changes state (see HatGame.on_change)
+    """
+
+    CACHE_SIZE = 256
+
+    version: int  # bumped on each change of listed data
+    on_change: Optional[Callable[[str], None]]  # called with ID of added, changed or removed game
+    __games: Dict[str, object]
+    __seq: Dict[str, int]  # game -> sequence number
+    __order: List[Tuple[int, str]]  # (sequence number, game), removed games are dropped lazily
+    __next: int
+    __indexed: Dict[str, Tuple[str, str]]  # game -> (name, state) it is indexed by
+    __by_name: Dict[str, Set[str]]
+    __by_state: Dict[str, Set[str]]
+    __cache: Dict[tuple, Tuple[int, str, bytes, Optional[int], List[int]]]
+
+    def __init__(self):
+        self.version = 0
+        self.on_change = None
+        self.__games = {}
+        self.__seq = {}
+        self.__order = []
+        self.__next = 0
+        self.__indexed = {}
+        self.__by_name = {}
+        self.__by_state = {}
+        self.__cache = {}
+
+    def __getitem__(self, gid):
+        return self.__games[gid]
+
+    def __contains__(self, gid):
+        return gid in self.__games
+
+    def __iter__(self):
+        return iter(self.__games)
+
+    def __len__(self):
+        return len(self.__games)
+
+    def get(self, gid, default=None):
+        return self.__games.get(gid, default)
+
+    def keys(self):
+        return self.__games.keys()
+
+    def values(self):
+        return self.__games.values()
+
+    def items(self):
+        return self.__games.items()
+
+    def __setitem__(self, gid, game):
+        old = self.__games.get(gid)
+        if old is not None:
+            old.on_change = None
+            self.__unindex(gid)
+        else:
+            self.__next += 1
+            self.__seq[gid] = self.__next
+            self.__order.append((self.__next, gid))
+
+        self.__games[gid] = game
+        game.on_change = self.__changed
+        self.__index(gid, game)
+        self.__bump(gid)
+
+    def __delitem__(self, gid):
+        game = self.__games.pop(gid)
+        game.on_change = None
+        self.__unindex(gid)
+        del self.__seq[gid]
+        self.__bump(gid)
+
+        if len(self.__order) > 2 * len(self.__games) + 16:
+            self.__order = [(s, g) for s, g in self.__order if self.__seq.get(g) == s]
+
+    def __index(self, gid, game):
+        key = (normalize(game.game_name), game.state)
+        self.__indexed[gid] = key
+        self.__by_name.setdefault(key[0], set()).add(gid)
+        self.__by_state.setdefault(key[1], set()).add(gid)
+
+    def __unindex(self, gid):
+        name, state = self.__indexed.pop(gid)
+        for index, key in ((self.__by_name, name), (self.__by_state, state)):
+            index[key].discard(gid)
+            if not index[key]:
+                del index[key]
+
+    def __changed(self, game):
+        gid = game.id
+        if self.__games.get(gid) is not game:
+            return
+
+        if self.__indexed[gid] != (normalize(game.game_name), game.state):
+            self.__unindex(gid)
+            self.__index(gid, game)
+        self.__bump(gid)
+
+    def __bump(self, gid):
+        self.version += 1
+        if self.on_change is not None:
+            self.on_change(gid)
+
+    @staticmethod
+    def etag(body: bytes) -> str:
+        """Content based, so page not changed by other games changes keeps its tag"""
+        return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+    def find(self, name: str = None, state: str = None, cursor: int = 0, limit: int = None):
+        """Games matching filters listed after cursor, and cursor of next page (None if it is the last one)"""
+        if name is None and state is None:
+            order = self.__order
+            start = bisect_right(order, (cursor, '\uffff'))
+            gids = (g for s, g in islice(order, start, None) if self.__seq.get(g) == s)
+        else:
+            sets = []
+            if name is not None:
+                sets.append(self.__by_name.get(normalize(name), set()))
+            if state is not None:
+                sets.append(self.__by_state.get(state, set()))
+            matched = set.intersection(*sets)
+            gids = iter(sorted([g for g in matched if self.__seq[g] > cursor], key=self.__seq.get))
+
+        ret = []
+        for gid in gids:
+            if limit is not None and len(ret) == limit:
+                return [self.__games[g] for g in ret], self.__seq[ret[-1]]
+            ret.append(gid)
+        return [self.__games[g] for g in ret], None
+
+    def cursor(self, gid: str) -> int:
+        """Cursor of page following given game"""
+        return self.__seq[gid]
+
+    def page(self, name: str = None, state: str = None, cursor: int = 0, limit: int = None):
+        """Encoded page of game list: (ETag, JSON body, next cursor, cursor after each listed game),
+        cached until next change"""
+        key = (normalize(name) if name is not None else None, state, cursor, limit)
+        cached = self.__cache.get(key)
+        if cached is not None and cached[0] == self.version:
+            METRICS.count('games_list_cached')
+            return cached[1:]
+
+        games, next_cursor = self.find(name, state, cursor, limit)
+        body = json.dumps([g.game_msg().args() for g in games], ensure_ascii=False).encode()
+        etag = GameRegistry.etag(body)
+        cursors = [self.__seq[g.id] for g in games]
+
+        if len(self.__cache) >= GameRegistry.CACHE_SIZE:
+            self.__cache.clear()
+        self.__cache[key] = (self.version, etag, body, next_cursor, cursors)
+        return etag, body, next_cursor, cursors
@@ -0,0 +1,50 @@
+import gc
+import os
+import pickle
+from typing import Dict
+
+from settings import log
+
+
+async def dumps(games: Dict[str, object]) -> bytes:
+    """Binary snapshot of all games, each game is taken between its commands"""
+    locked = []
+    try:
+        for g in games.values():
+            await g.lock.acquire()
+            locked.append(g)
+
+        gc.disable()  # temporary state tuples would trigger collections
+        try:
+            return pickle.dumps(dict(games), protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            gc.enable()
+    finally:
+        for g in locked:
+            g.lock.release()
+
+
+def loads(data: bytes) -> dict:
+    """Games from snapshot, timers are started by game.resume()"""
+    gc.disable()  # nothing to collect, but lots of new objects would trigger collections
+    try:
+        return pickle.loads(data)
+    finally:
+        gc.enable()
+
+
+async def save(games: Dict[str, object], path: str) -> None:
+    data = await dumps(games)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+    log.info(f'Saved {len(games)} games to {path}, {len(data)} bytes')
+
+
+def load(path: str) -> dict:
+    """Load games saved by save(), snapshot file is consumed"""
+    with open(path, 'rb') as f:
+        games = loads(f.read())
+    os.remove(path)  # would bring back stale games after next unclean restart
+    log.info(f'Loaded {len(games)} games from {path}')
+    return games
@@ -9,6 +9,7 @@ class Timer:
         self._callback = callback
         self._args = args
         self._kwargs = kwargs
+        self._deadline = asyncio.get_event_loop().time() + timeout
         self._task = asyncio.ensure_future(self._job())
 
     async def _job(self):
@@ -18,11 +19,16 @@ class Timer:
     def cancel(self):
         self._task.cancel()
 
+    def remaining(self) -> float:
+        """Seconds left until callback is called"""
+        return max(self._deadline - asyncio.get_event_loop().time(), 0)
+
 
 class Scheduler(Timer):
     """Asynchronous scheduler"""
 
     async def _job(self):
         await asyncio.sleep(self._timeout)
+        self._deadline = asyncio.get_event_loop().time() + self._timeout
         self._task = asyncio.ensure_future(self._job())
         await self._callback(*self._args, **self._kwargs)
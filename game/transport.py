@@ -0,0 +1,250 @@
+import asyncio
+import itertools
+import json
+from abc import (ABC, abstractmethod)
+import os
+import time
+from typing import (Dict, Iterator, Optional, Tuple)
+
+from aiohttp import web
+
+from settings import log
+from .metrics import METRICS
+from .outbox import Outbox
+
+
+class RemoteSocket:
+    """Websocket of player connected to other node, game sends to it as to local one"""
+
+    closed: bool
+
+    def __init__(self, transport: 'Transport', node: str, conn: int):
+        self.transport = transport
+        self.node = node
+        self.conn = conn
+        self.closed = False
+
+    def send_frame(self, frame: str, cmd: str = None):
+        """Frame goes to outbox of player connection with its cmd, so it may be superseded there"""
+        if not self.closed:
+            self.transport.publish(self.node, ('frame', self.conn, cmd, frame))
+
+    async def send_str(self, data):
+        self.send_frame(data)
+
+    async def close(self, *args, **kwargs):
+        if not self.closed:
+            self.closed = True
+            self.transport.remotes.pop((self.node, self.conn), None)
+            self.transport.publish(self.node, ('close', self.conn))
+
+
+class Transport(ABC):
+    """Messages between nodes serving one set of games
+
+    Node owning a game talks to players connected to other nodes through RemoteSocket,
+    commands of these players come back to owner. Items published to a node during
+    one event loop iteration go to it as one batch. Subclasses implement send_batch()
+    and pass batches coming from other nodes to receive()
+
+    Items:
+        ('frame', conn, cmd, frame) send frame of message cmd to local connection
+        ('close', conn)             close local connection
+        ('cmd', gid, conn, data)    command from remote connection to game
+        ('gone', gid, conn)         remote connection was closed by player
+
+    Connection numbers are never reused by node, so frames of game are never sent
+    to connection opened after the one they were meant to
+    """
+
+    node: str
+    games: Optional[dict]  # games of this node, set by application
+    sockets: Dict[int, Outbox]  # local connections to games of other nodes
+    remotes: Dict[Tuple[str, int], RemoteSocket]
+    __queues: Dict[str, list]
+    __since: Optional[float]  # publish time of first item in queues
+    __conns: Iterator[int]  # numbers of local connections
+
+    def __init__(self, node: str):
+        self.node = node
+        self.games = None
+        self.sockets = {}
+        self.remotes = {}
+        self.__queues = {}
+        self.__since = None
+        self.__conns = itertools.count(1)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def send_batch(self, node: str, batch: dict):
+        """Deliver batch to node, which passes it to its receive()"""
+
+    def remote(self, node: str, conn: int) -> RemoteSocket:
+        ws = self.remotes.get((node, conn))
+        if ws is None:
+            ws = self.remotes[(node, conn)] = RemoteSocket(self, node, conn)
+        return ws
+
+    def publish(self, node: str, item: tuple) -> None:
+        """Queue item to node, sent on next loop iteration"""
+        if self.__since is None:
+            self.__since = time.time()
+            asyncio.get_event_loop().call_soon(self.__flush)
+
+        self.__queues.setdefault(node, []).append(item)
+
+    def __flush(self):
+        queues, self.__queues = self.__queues, {}
+        since, self.__since = self.__since, None
+
+        for node, items in queues.items():
+            METRICS.count('transport_batches')
+            METRICS.count('transport_items', len(items))
+            asyncio.ensure_future(self.__send(node, {'from': self.node, 'ts': since, 'items': items}))
+
+    async def __send(self, node: str, batch: dict):
+        try:
+            await self.send_batch(node, batch)
+        except Exception as e:
+            log.error(f'Transport {self.node}: batch of {len(batch["items"])} to node {node} lost: {e}')
+
+    async def receive(self, batch: dict):
+        """Apply batch from other node"""
+        METRICS.timer('fanout').observe((time.time() - batch['ts']) * 1000)
+
+        src = batch['from']
+        for item in batch['items']:
+            kind = item[0]
+            if kind == 'frame':
+                conn, cmd, frame = item[1:]
+                ob = self.sockets.get(conn)
+                if ob is not None:
+                    ob.put(cmd, frame)
+            elif kind == 'close':
+                ob = self.sockets.pop(item[1], None)
+                if ob is not None:
+                    ob.disconnect('closed by game')
+            elif kind == 'gone':
+                gid, conn = item[1:]
+                ws = self.remotes.pop((src, conn), None)
+                if ws is not None:
+                    ws.closed = True  # player of game keeps it until reconnect, nothing is sent to it
+                    g = self.games.get(gid) if self.games is not None else None
+                    if g is not None:
+                        g.close_outbox(ws)
+            elif kind == 'cmd':
+                gid, conn, data = item[1:]
+                g = self.games.get(gid) if self.games is not None else None
+                if g is not None:
+                    # commands of one game are applied in order they are started, see HatGame.lock
+                    asyncio.ensure_future(g.cmd(self.remote(src, conn), data))
+            else:
+                log.error(f'Transport {self.node}: unknown item {kind} from node {src}')
+
+    async def serve(self, request: web.Request, node: str, gid: str) -> web.WebSocketResponse:
+        """Serve player websocket for game of other node: commands are sent to node,
+        frames sent by game come back through receive()"""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        request.app.websockets.add(ws)
+
+        conn = next(self.__conns)
+        self.sockets[conn] = Outbox(ws)
+        try:
+            while True:
+                try:
+                    data = await ws.receive_json()
+                except json.decoder.JSONDecodeError as e:
+                    log.debug(f'Invalid message format {e}')
+                    continue
+                except TypeError:
+                    break  # connection closed
+
+                self.publish(node, ('cmd', gid, conn, data))
+        finally:
+            ob = self.sockets.pop(conn, None)
+            if ob is not None:
+                ob.close()
+                self.publish(node, ('gone', gid, conn))
+            request.app.websockets.discard(ws)
+
+        return ws
+
+
+class MemoryTransport(Transport):
+    """Nodes in one process, registered in shared `hub`"""
+
+    def __init__(self, node: str, hub: Dict[str, 'MemoryTransport']):
+        super().__init__(node)
+        self.hub = hub
+        hub[node] = self
+
+    async def send_batch(self, node: str, batch: dict):
+        await self.hub[node].receive(batch)
+
+
+class LocalSocketTransport(Transport):
+    """Nodes on one host, batches are length-prefixed JSON over unix sockets in directory `path`"""
+
+    path: str
+    __server: Optional[asyncio.AbstractServer]
+    __writers: Dict[str, asyncio.StreamWriter]
+    __locks: Dict[str, asyncio.Lock]  # keeps batches to node in order while connecting
+
+    def __init__(self, node: str, path: str):
+        super().__init__(node)
+        self.path = path
+        self.__server = None
+        self.__writers = {}
+        self.__locks = {}
+
+    def address(self, node: str) -> str:
+        return os.path.join(self.path, f'{node}.sock')
+
+    async def start(self):
+        os.makedirs(self.path, exist_ok=True)
+        if os.path.exists(self.address(self.node)):
+            os.remove(self.address(self.node))
+        self.__server = await asyncio.start_unix_server(self.__serve, path=self.address(self.node))
+
+    async def close(self):
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+            self.__server = None
+
+        for w in self.__writers.values():
+            w.close()
+        self.__writers = {}
+
+    async def __serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                size = int.from_bytes(await reader.readexactly(4), 'big')
+                await self.receive(json.loads(await reader.readexactly(size)))
+        except asyncio.IncompleteReadError:
+            pass  # peer closed connection
+        finally:
+            writer.close()
+
+    async def send_batch(self, node: str, batch: dict):
+        data = json.dumps(batch, ensure_ascii=False).encode()
+
+        lock = self.__locks.setdefault(node, asyncio.Lock())
+        async with lock:
+            w = self.__writers.get(node)
+            if w is None or w.is_closing():
+                _, w = await asyncio.open_unix_connection(self.address(node))
+                self.__writers[node] = w
+
+            w.write(len(data).to_bytes(4, 'big') + data)
+            try:
+                await w.drain()
+            except ConnectionError:
+                self.__writers.pop(node, None)
+                raise
@@ -17,6 +17,14 @@ class Turn:
         self.__num_guessed = 0
         self.__word = None
 
+    def __getstate__(self):
+        """Pair players are not a part of turn state, they are set back by game"""
+        return self.__missed_words, self.__num_guessed, self.__word
+
+    def __setstate__(self, state):
+        self.explaining = self.guessing = None
+        self.__missed_words, self.__num_guessed, self.__word = state
+
     def __contains__(self, p: Player):
         return p in (self.explaining, self.guessing)
 
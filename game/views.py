@@ -1,9 +1,12 @@
 from aiohttp import web
-from asyncio import CancelledError
+from asyncio import (CancelledError, gather)
 
 from settings import log, NEED_CORS
 from . import message
 from .hat import HatGame
+from .cluster import FORWARDED
+from .metrics import METRICS
+from .registry import GameRegistry
 
 import json
 
@@ -12,6 +15,8 @@ class NewGame(web.View):
     async def post(self):
         ngmsg = message.Newgame.msg(await self.request.json())
         game = HatGame(**ngmsg.args())
+        if self.request.app.cluster is not None:
+            game.id = self.request.app.cluster.new_id()  # served by this worker
 
         log.debug(f'New game request - {ngmsg.args()}')
 
@@ -23,6 +28,10 @@ class NewGame(web.View):
             )
 
         self.request.app.games[game.id] = game
+        self.request.app.expiry.add(game)
+        game.start_journal(self.request.app.journal)
+        if self.request.app.recorder is not None:
+            self.request.app.recorder.start(game)
 
         log.info(f"New game created id={game.id}, name='{game.game_name}''")
 
@@ -32,7 +41,7 @@ class NewGame(web.View):
 
         return web.Response(
             content_type='application/json',
-            text=json.dumps(game.game_msg().data(), ensure_ascii=False),
+            body=game.game_msg().to_json_bytes(),
             headers=headers
         )
 
@@ -65,36 +74,159 @@ class GetGame(web.View):
 
         return web.Response(
             content_type='application/json',
-            text=json.dumps(game.game_msg().data(), ensure_ascii=False),
+            body=game.game_msg(score=True).to_json_bytes(),
             headers=headers)
 
 
-class ListGames(web.View):
+class GameStats(web.View):
     async def get(self):
+        gid = self.request.match_info['id']
+
+        try:
+            game = self.request.app.games[gid]
+        except KeyError:
+            log.info(f"Game Stats id={gid} - not found")
+            return web.Response(
+                content_type='application/json',
+                text=str(message.Error(code=100, message=f'Game with ID {gid} is unknown'))
+            )
 
-        log.info(f"List Games num={len(self.request.app.games)}")
+        headers = {}
+        if NEED_CORS and 'Origin' in self.request.headers:
+            headers = {'Access-Control-Allow-Origin': self.request.headers['Origin']}
 
-        # filters
-        fname = self.request.rel_url.query.get('name', '').lower()
+        return web.Response(
+            content_type='application/json',
+            text=json.dumps({'id': game.id, 'seed': game.seed, 'outboxes': game.outbox_stats()}, ensure_ascii=False),
+            headers=headers)
 
-        ret = []
-        for game in self.request.app.games.values():
-            if fname and game.game_name.lower() != fname:
-                continue
 
-            ret.append(game.game_msg().args())
+class ListGames(web.View):
+    """Games list page, see GameRegistry.page()
+
+    Cluster cursor holds position in each worker list, '.'-separated, '-' for worker listed
+    to the end. Page is filled from workers in order, so it is never longer than `limit`
+    """
+
+    @staticmethod
+    def parse_cursor(cursor: str, workers: int) -> list:
+        if not cursor:
+            return [0] * workers
+        ret = [None if c == '-' else int(c) for c in cursor.split('.')]
+        if len(ret) != workers:
+            raise ValueError(f'cursor of {workers} workers expected')
+        return ret
+
+    async def merged(self, name, state, cursors, limit):
+        """Page gathered from all workers and cursor of next one"""
+        cluster = self.request.app.cluster
+        url = self.request.rel_url
+
+        async def page(worker, cursor):
+            if worker == cluster.worker:
+                _, body, next_cursor, seqs = self.request.app.games.page(name, state, cursor, limit)
+                return json.loads(body), next_cursor, seqs
+            data, headers = await cluster.fetch(worker, url.update_query(cursor=cursor).path_qs)
+            next_cursor = headers.get('X-Next-Cursor')
+            return (data, int(next_cursor) if next_cursor else None,
+                    [int(c) for c in headers.get('X-Game-Cursors', '').split(',') if c])
+
+        active = [(i, c) for i, c in enumerate(cursors) if c is not None]
+        pages = await gather(*[page(i, c) for i, c in active])
+
+        ret, nexts = [], list(cursors)
+        for (i, cursor), (data, next_cursor, seqs) in zip(active, pages):
+            room = len(data) if limit is None else limit - len(ret)
+            if room >= len(data):
+                ret.extend(data)
+                nexts[i] = next_cursor
+            elif room > 0:
+                ret.extend(data[:room])
+                nexts[i] = seqs[room - 1]
+
+        if all(c is None for c in nexts):
+            return ret, None
+        return ret, '.'.join('-' if c is None else str(c) for c in nexts)
+
+    async def get(self):
+        games = self.request.app.games
+        log.info(f"List Games num={len(games)}")
+
+        # filters and page
+        query = self.request.rel_url.query
+        name, state = query.get('name') or None, query.get('state') or None
+        cluster = self.request.app.cluster
+        local = cluster is None or FORWARDED in self.request.headers
+        try:
+            limit = int(query['limit']) if 'limit' in query else None
+            if local:
+                cursor = int(query.get('cursor', 0))
+            else:
+                cursors = ListGames.parse_cursor(query.get('cursor'), cluster.workers)
+        except ValueError as e:
+            return web.Response(
+                status=400,
+                content_type='application/json',
+                text=str(message.Error(code=102, message=f'Invalid list parameters: {e}')))
 
-        log.info(f"List Games, {len(ret)} returned out of {len(self.request.app.games)}")
         headers = {}
+        if local:
+            etag, body, next_cursor, seqs = games.page(name=name, state=state, cursor=cursor, limit=limit)
+            if cluster is not None:
+                headers['X-Game-Cursors'] = ','.join(map(str, seqs))  # for worker merging pages
+        else:
+            ret, next_cursor = await self.merged(name, state, cursors, limit)
+            body = json.dumps(ret, ensure_ascii=False).encode()
+            etag = GameRegistry.etag(body)
+
+        headers['ETag'] = etag
+        if next_cursor is not None:
+            headers['X-Next-Cursor'] = str(next_cursor)
         if NEED_CORS and 'Origin' in self.request.headers:
-            headers = {'Access-Control-Allow-Origin': self.request.headers['Origin']}
+            headers['Access-Control-Allow-Origin'] = self.request.headers['Origin']
+            headers['Access-Control-Expose-Headers'] = 'ETag, X-Next-Cursor'
 
+        if etag in self.request.headers.get('If-None-Match', ''):
+            log.info("List Games, not modified")
+            return web.Response(status=304, headers=headers)
+
+        log.info(f"List Games, {len(body)} bytes returned")
         return web.Response(
             content_type='application/json',
-            text=json.dumps(ret, ensure_ascii=False),
+            body=body,
             headers=headers)
 
 
+class LobbySocket(web.View):
+    """Games list subscription: snapshot, then changes of games, see Lobby"""
+
+    async def get(self):
+        ws = web.WebSocketResponse()
+        self.request.app.websockets.add(ws)
+        await ws.prepare(self.request)
+
+        lobby = self.request.app.lobby
+        lobby.subscribe(ws, local=FORWARDED in self.request.headers)
+        try:
+            async for _ in ws:
+                pass  # nothing expected from subscriber
+        except CancelledError:
+            pass
+        finally:
+            lobby.unsubscribe(ws)
+            self.request.app.websockets.discard(ws)
+
+        log.debug('lobby connection closed')
+        return ws
+
+
+class GetMetrics(web.View):
+    async def get(self):
+        return web.Response(
+            content_type='application/json',
+            text=json.dumps(METRICS.data(), ensure_ascii=False))
+
+
 class Login(web.View):
     async def post(self):
         print('Login')
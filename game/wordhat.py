@@ -0,0 +1,97 @@
+import random
+from collections import Counter
+from typing import (Iterable, List, Optional)
+
+
+class WordHat:
+    """Hat of words: O(1) random draw, O(1) return of missed word and O(1) tour reset
+
+    All words live in one array, words still in hat occupy its head [0, size).
+    Drawn word is swapped to the end of the head, so words drawn during current turn
+    always occupy slots [size, size + drawn)
+
+    Generator is reseeded with `base + epoch` on each turn end and tour reset, so
+    hat state is restored from few numbers, see __setstate__(). Restored generator
+    is caught up on first use, most restored games never draw again before expiry
+    """
+
+    rng: Optional[random.Random]
+    __words: List[str]
+    __size: int
+    __drawn: int  # number of words drawn during current turn
+    __base: int
+    __epoch: int
+
+    def __init__(self, words: Iterable[str] = (), rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+        self.fill(words)
+
+    def __len__(self):
+        return self.__size
+
+    def __iter__(self):
+        return iter(self.__words[:self.__size])
+
+    def __getstate__(self):
+        return self.__words, self.__size, self.__drawn, self.__base, self.__epoch
+
+    def __setstate__(self, state):
+        self.__words, self.__size, self.__drawn, self.__base, self.__epoch = state
+        self.rng = None
+
+    def __restore_rng(self) -> random.Random:
+        self.rng = random.Random(self.__base + self.__epoch)
+        for i in range(self.__drawn):  # draws of current turn
+            self.rng.randrange(0, self.__size + self.__drawn - i)
+        return self.rng
+
+    def fill(self, words: Iterable[str]) -> None:
+        """Put new set of words to hat"""
+        self.__words = list(words)
+        self.__base = (self.rng or self.__restore_rng()).getrandbits(32)
+        self.__epoch = 0
+        self.reset()
+
+    def __next_epoch(self):
+        self.__epoch += 1
+        if self.rng is None:
+            self.rng = random.Random(self.__base + self.__epoch)
+        else:
+            self.rng.seed(self.__base + self.__epoch)
+
+    def reset(self) -> None:
+        """Return all words to hat, called on tour start"""
+        self.__size = len(self.__words)
+        self.__drawn = 0
+        self.__next_epoch()
+
+    def draw(self) -> str:
+        """Take random word from hat"""
+        if self.__size == 0:
+            raise ValueError("No more words - unexpected")
+
+        w = self.__words
+        last = self.__size - 1
+        i = (self.rng or self.__restore_rng()).randrange(0, self.__size)
+        w[i], w[last] = w[last], w[i]
+
+        self.__size = last
+        self.__drawn += 1
+        return w[last]
+
+    def put_back(self, missed: Iterable[str]) -> None:
+        """Return words miss-guessed during current turn back to hat, finishes the turn"""
+        missed = Counter(missed)
+        w = self.__words
+
+        if missed:
+            # drawn slots processed in ascending order, so word moved out of slot `size`
+            # was already checked and is never needed again
+            for slot in range(self.__size, self.__size + self.__drawn):
+                if missed[w[slot]] > 0:
+                    missed[w[slot]] -= 1
+                    w[slot], w[self.__size] = w[self.__size], w[slot]
+                    self.__size += 1
+
+        self.__drawn = 0
+        self.__next_epoch()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Load test of running server: many concurrent games played by quiet robots
+in pool of processes, prints round trip latency of client commands and
+throughput as one JSON object, to be compared between builds
+"""
+from asyncio import (Semaphore, gather, run, wait_for)
+from concurrent.futures import ProcessPoolExecutor
+import getopt
+import json
+import os
+import sys
+import time
+from typing import Tuple
+
+from robot.probe import Probe
+from robot.robot import (Robot, client_session)
+import settings
+
+
+async def play_game(site: str, players: int, words: int, timer: int, probe: Probe, session) -> bool:
+    """Create game and play it to the end, returns True if game finished"""
+    created = time.perf_counter()
+    leader = Robot(uri=site, numwords=words, timer=timer, pname='robot0', quiet=True, probe=probe, session=session)
+    await leader.newgame()
+
+    robots = [leader] + [Robot(uri=site, id=leader.id, pname=f'robot{i}', quiet=True, probe=probe, session=session)
+                         for i in range(1, players)]
+    res = await gather(leader.run(pnum=players), *[r.run() for r in robots[1:]])
+
+    for r in robots:
+        t = r.timings
+        probe.stage('connect', (t['connect'] - t['start']) * 1000)
+        probe.stage('login', (t['setup'] - t['connect']) * 1000)
+    if 'play' in leader.timings:
+        probe.stage('first_play', (leader.timings['play'] - created) * 1000)
+
+    return res[0] is not None
+
+
+async def play_games(site: str, players: int, words: int, timer: int, games: int, concurrency: int,
+                     timeout: float, connections: int) -> Tuple[Probe, int]:
+    probe = Probe()
+    limit = Semaphore(concurrency)
+
+    async with client_session(connections) as session:
+        async def one():
+            async with limit:
+                try:
+                    return await wait_for(play_game(site, players, words, timer, probe, session), timeout)
+                except Exception as e:
+                    settings.log.error(f'Game failed: {type(e).__name__} {e}')
+                    return False
+
+        done = await gather(*[one() for _ in range(games)])
+
+    return probe, sum(done)
+
+
+def load_chunk(site: str, players: int, words: int, timer: int, games: int, concurrency: int,
+               timeout: float, connections: int) -> Tuple[Probe, int]:
+    """Play `games` games, at most `concurrency` at once, runs in worker process"""
+    return run(play_games(site, players, words, timer, games, concurrency, timeout, connections))
+
+
+class Options:
+
+    site: str
+    games: int
+    concurrency: int
+    jobs: int
+    players: int
+    words: int
+    timer: int
+    timeout: float
+    connections: int
+
+    @staticmethod
+    def usage(err=None):
+        if err:
+            print(f'Error: {err}', file=sys.stderr)
+
+        print(f"""
+USAGE:
+    {sys.argv[0]} [<flags>]
+Flags:
+    -h, --help              Help (this)
+    -u, --site <uri>        Server to load (default: http://127.0.0.1:<PORT>)
+    -g, --games <num>       Games to play in total (default: 100)
+    -c, --concurrency <num> Games played at once by each process (default: 10)
+    -j, --jobs <num>        Robot processes (default: number of CPUs)
+    -p, --players <num>     Players in game (default: 4)
+    -w, --words <num>       Words per player (default: 6)
+    -t, --timer <sec>       Turn timer (default: 1)
+    -T, --timeout <sec>     Game considered failed if not finished in time (default: 300)
+    -l, --limit <num>       Connections of each process, websockets included (default: 0 - no limit)
+""", file=sys.stderr)
+        sys.exit(1)
+
+    def __init__(self, argv):
+        self.site = f'http://127.0.0.1:{settings.SITE_PORT}'
+        self.games = 100
+        self.concurrency = 10
+        self.jobs = os.cpu_count() or 1
+        self.players = 4
+        self.words = 6
+        self.timer = 1
+        self.timeout = 300
+        self.connections = 0
+
+        try:
+            opts, args = getopt.getopt(argv[1:], "hu:g:c:j:p:w:t:T:l:", [
+                'help', 'site=', 'games=', 'concurrency=', 'jobs=', 'players=', 'words=', 'timer=', 'timeout=',
+                'limit='
+            ])
+        except getopt.GetoptError as err:
+            Options.usage(err)
+            return
+
+        for o, a in opts:
+            if o in ("-h", "--help"):
+                Options.usage()
+            elif o in ("-u", "--site"):
+                self.site = a
+            elif o in ("-g", "--games"):
+                self.games = int(a)
+            elif o in ("-c", "--concurrency"):
+                self.concurrency = int(a)
+            elif o in ("-j", "--jobs"):
+                self.jobs = int(a)
+            elif o in ("-p", "--players"):
+                self.players = int(a)
+            elif o in ("-w", "--words"):
+                self.words = int(a)
+            elif o in ("-t", "--timer"):
+                self.timer = int(a)
+            elif o in ("-T", "--timeout"):
+                self.timeout = float(a)
+            elif o in ("-l", "--limit"):
+                self.connections = int(a)
+            else:
+                Options.usage(f"unhandled option {o}")
+
+        if args:
+            Options.usage('No arguments expected')
+
+
+def main():
+    opts = Options(sys.argv)
+    jobs = max(1, min(opts.jobs, opts.games))
+
+    probe, finished = Probe(), 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(load_chunk, opts.site, opts.players, opts.words, opts.timer,
+                               opts.games // jobs + (i < opts.games % jobs), opts.concurrency, opts.timeout,
+                               opts.connections)
+                   for i in range(jobs)]
+        for f in futures:
+            p, n = f.result()
+            probe.merge(p)
+            finished += n
+    elapsed = time.perf_counter() - started
+
+    data = probe.data()
+    print(json.dumps({
+        'games': opts.games,
+        'failed': opts.games - finished,
+        'players': opts.players,
+        'jobs': jobs,
+        'concurrency': opts.concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'games_per_s': round(finished / elapsed, 3),
+        'messages_per_s': round((data['sent'] + data['received']) / elapsed, 1),
+        **data,
+    }), flush=True)
+
+
+if __name__ == '__main__':
+    main()
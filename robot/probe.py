@@ -0,0 +1,70 @@
+import time
+from typing import (Dict, Optional, Tuple)
+
+from game.metrics import Histogram
+
+# first server message answering client command, round trip is measured until it comes
+REPLIES = {
+    'name': ('game',),
+    'play': ('tour', 'wait'),
+    'ready': ('start',),
+    'guessed': ('next',),
+}
+
+
+class Probe:
+    """Traffic and round trip latency of client commands, shared by robots of one process
+
+    Each robot keeps at most one command waiting for reply: command sent before reply
+    came (e.g. last answer, which gets no next word) stops measuring of previous one
+    """
+
+    latency: Dict[str, Histogram]  # command -> round trip, in milliseconds
+    setup: Dict[str, Histogram]  # robot setup stage -> duration, in milliseconds, see Robot.timings
+    sent: int
+    received: int
+
+    def __init__(self):
+        self.latency = {}
+        self.setup = {}
+        self.sent = 0
+        self.received = 0
+
+    def send(self, cmd: str) -> Optional[Tuple[str, float]]:
+        """Account command sent, returns reply robot should wait for"""
+        self.sent += 1
+        return (cmd, time.perf_counter()) if cmd in REPLIES else None
+
+    def receive(self, cmd: str, waiting: Optional[Tuple[str, float]]) -> bool:
+        """Account message received, returns True if it answers waiting command"""
+        self.received += 1
+        if waiting is None or cmd not in REPLIES[waiting[0]]:
+            return False
+
+        h = self.latency.get(waiting[0])
+        if h is None:
+            h = self.latency[waiting[0]] = Histogram()
+        h.observe((time.perf_counter() - waiting[1]) * 1000)
+        return True
+
+    def stage(self, name: str, ms: float):
+        h = self.setup.get(name)
+        if h is None:
+            h = self.setup[name] = Histogram()
+        h.observe(ms)
+
+    def merge(self, other: 'Probe'):
+        self.sent += other.sent
+        self.received += other.received
+        for cmd, h in other.latency.items():
+            self.latency.setdefault(cmd, Histogram()).merge(h)
+        for name, h in other.setup.items():
+            self.setup.setdefault(name, Histogram()).merge(h)
+
+    def data(self) -> dict:
+        return {
+            'sent': self.sent,
+            'received': self.received,
+            'latency': dict([(cmd, h.data()) for cmd, h in sorted(self.latency.items())]),
+            'setup': dict([(name, h.data()) for name, h in sorted(self.setup.items())]),
+        }
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Replay of recorded games (see game.recorder) against running server: commands of each
+recorded connection are sent in recorded order, frames sent back are compared with
+recorded ones. Prints result of each recording and totals as JSON
+"""
+from asyncio import (Condition, TimeoutError, ensure_future, gather, run, sleep, wait_for)
+import getopt
+import json
+import sys
+import time
+from typing import (Dict, List, Optional)
+
+from aiohttp import WSMsgType
+
+from game.recorder import (TIMED, read)
+from robot.robot import (Robot, client_session)
+import settings
+
+
+def timed(frame: str) -> bool:
+    return json.loads(frame).get('cmd') in TIMED
+
+
+def first_mismatch(expected: Dict[int, List[str]], received: Dict[int, List[str]]) -> Optional[dict]:
+    for conn, frames in expected.items():
+        got = received.get(conn, [])
+        for i in range(max(len(frames), len(got))):
+            e = frames[i] if i < len(frames) else None
+            g = got[i] if i < len(got) else None
+            if e != g:
+                return {'conn': conn, 'frame': i, 'expected': e, 'received': g}
+    return None
+
+
+async def replay(site: str, path: str, speed: float, timeout: float, session) -> dict:
+    """Replay one recording: at recorded pace multiplied by `speed`, or as fast as possible if it is 0
+
+    Command is sent only after its connection and all others got frames recorded before it,
+    so turns ended by timer are replayed at server timer pace whatever the speed is
+    """
+    header, events = read(path)
+    expected = {}  # conn -> frames
+    commands = []  # (ms, conn, data, frames expected by each connection before command)
+    for kind, ms, conn, payload in events:
+        if kind == '<':
+            commands.append((ms, conn, payload, dict([(c, len(f)) for c, f in expected.items()])))
+        elif not timed(payload):
+            expected.setdefault(conn, []).append(payload)
+
+    r = Robot(uri=site, name=header['name'], numwords=header['numwords'], timer=header['timer'],
+              seed=header['seed'], quiet=True, session=session)
+    gid = await r.newgame()
+
+    received = {}
+    sockets = {}
+    readers = []
+    progress = Condition()
+
+    async def reader(conn, ws):
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                break
+            frame = msg.data.replace(gid, header['id'])
+            if not timed(frame):
+                received[conn].append(frame)
+                async with progress:
+                    progress.notify_all()
+
+    async def caught_up(counts):
+        async with progress:
+            await wait_for(progress.wait_for(
+                lambda: all(len(received.get(c, ())) >= n for c, n in counts.items())), timeout)
+
+    stalled = None
+    started = time.perf_counter()
+    for ms, conn, data, counts in commands:
+        if speed:
+            delay = started + ms / 1000 / speed - time.perf_counter()
+            if delay > 0:
+                await sleep(delay)
+
+        try:
+            await caught_up(counts)
+        except TimeoutError:
+            stalled = data
+            break
+
+        if conn not in sockets:
+            sockets[conn] = await session.ws_connect(f'{site}/ws/{gid}')
+            received[conn] = []
+            readers.append(ensure_future(reader(conn, sockets[conn])))
+        await sockets[conn].send_json(data)
+
+    if stalled is None:
+        try:
+            await caught_up(dict([(c, len(f)) for c, f in expected.items()]))
+            await sleep(0.05)  # frames not expected come in time too
+        except TimeoutError:
+            stalled = 'end'
+    elapsed = time.perf_counter() - started
+
+    for ws in sockets.values():
+        await ws.close()
+    for t in readers:
+        t.cancel()
+
+    return {
+        'recording': path,
+        'game': header['id'],
+        'seed': header['seed'],
+        'commands': len(commands),
+        'frames': sum(len(f) for f in expected.values()),
+        'elapsed_s': round(elapsed, 3),
+        'stalled': stalled,
+        'mismatch': first_mismatch(expected, received),
+    }
+
+
+class Options:
+
+    site: str
+    speed: float
+    timeout: float
+    files: List[str]
+
+    @staticmethod
+    def usage(err=None):
+        if err:
+            print(f'Error: {err}', file=sys.stderr)
+
+        print(f"""
+USAGE:
+    {sys.argv[0]} [<flags>] <recording> [<recording> ...]
+Flags:
+    -h, --help              Help (this)
+    -u, --site <uri>        Server to replay against (default: http://127.0.0.1:<PORT>)
+    -x, --speed <factor>    Pace of recording multiplied by <factor>, 0 - as fast as possible (default: 0)
+    -T, --timeout <sec>     Replay stalled if expected frames are not got in time (default: 60)
+""", file=sys.stderr)
+        sys.exit(1)
+
+    def __init__(self, argv):
+        self.site = f'http://127.0.0.1:{settings.SITE_PORT}'
+        self.speed = 0
+        self.timeout = 60
+
+        try:
+            opts, args = getopt.getopt(argv[1:], "hu:x:T:", ['help', 'site=', 'speed=', 'timeout='])
+        except getopt.GetoptError as err:
+            Options.usage(err)
+            return
+
+        for o, a in opts:
+            if o in ("-h", "--help"):
+                Options.usage()
+            elif o in ("-u", "--site"):
+                self.site = a
+            elif o in ("-x", "--speed"):
+                self.speed = float(a)
+            elif o in ("-T", "--timeout"):
+                self.timeout = float(a)
+            else:
+                Options.usage(f"unhandled option {o}")
+
+        if not args:
+            Options.usage('No recordings given')
+        self.files = args
+
+
+async def main():
+    opts = Options(sys.argv)
+
+    started = time.perf_counter()
+    async with client_session() as session:
+        results = await gather(*[replay(opts.site, f, opts.speed, opts.timeout, session) for f in opts.files])
+    elapsed = time.perf_counter() - started
+
+    for res in results:
+        print(json.dumps(res, ensure_ascii=False))
+
+    commands = sum(r['commands'] for r in results)
+    frames = sum(r['frames'] for r in results)
+    print(json.dumps({
+        'recordings': len(results),
+        'matched': len([r for r in results if r['mismatch'] is None and r['stalled'] is None]),
+        'elapsed_s': round(elapsed, 3),
+        'commands_per_s': round(commands / elapsed, 1),
+        'frames_per_s': round(frames / elapsed, 1),
+    }), flush=True)
+
+
+if __name__ == '__main__':
+    run(main())
@@ -2,14 +2,18 @@
 Robot is a artificial intelligence which can play TheHat game
 don't wary - nothing serious, just random answers
 """
-from asyncio import (sleep, ensure_future)
-from aiohttp import ClientSession, ClientWebSocketResponse, WSMsgType
+from asyncio import (Future, sleep, ensure_future, get_event_loop)
+from aiohttp import ClientSession, ClientWebSocketResponse, TCPConnector, WSMsgType
+from contextlib import asynccontextmanager
 import json
 import names
 import random
-from typing import (List, Dict, Optional)
+import time
+from collections import deque
+from typing import (Deque, List, Dict, Optional, Tuple, Type)
 from colorama import Fore, Back, Style
 
+from .probe import Probe
 from .words import NOUNS
 import game.message as message
 from settings import log
@@ -40,20 +44,38 @@ COLORS = [
 ]
 
 
+def client_session(limit: int = 0) -> ClientSession:
+    """Session to share by all robots of one run, at most `limit` connections (0 - no limit)
+
+    Note: each robot websocket holds its connection for the whole game
+    """
+    return ClientSession(connector=TCPConnector(limit=limit))
+
+
 class Robot:
     uri: str
     ws: ClientWebSocketResponse
-    queue: List[message.ServerMessage]
+    inbox: Dict[Type[message.ServerMessage], Deque[message.ServerMessage]]  # not consumed messages by class
+    waiters: Dict[Type[message.ServerMessage], List[Future]]  # see wait_msg()
     players: Dict[str, message.UserInfo]
+    roster_version: int
     tour: Optional[message.Tour]
     turn: Optional[message.Turn]
     turn: Optional[message.Finish]
-
-    def __init__(self, uri=None, idx=None, id=None, name=None, numwords=6, timer=1, reset=False):
+    quiet: bool  # log errors only
+    probe: Optional[Probe]
+    waiting: Optional[Tuple[str, float]]  # command waiting for reply, see Probe
+    session: Optional[ClientSession]  # shared with other robots, see client_session()
+    timings: Dict[str, float]  # run() stage -> time.perf_counter() when it was reached
+
+    def __init__(self, uri=None, idx=None, id=None, name=None, numwords=6, timer=1, reset=False,
+                 pname=None, quiet=False, probe=None, session=None, seed=None):
         self.uri = uri
-        self.pname = names.get_first_name()
-        self.queue = []
+        self.pname = pname or names.get_first_name()
+        self.inbox = {}
+        self.waiters = {}
         self.players = {}
+        self.roster_version = 0
         self.tour = None
         self.turn = None
         self.finish = None
@@ -65,6 +87,12 @@ class Robot:
         self.numwords = numwords
         self.timer = timer
         self.reset = reset
+        self.quiet = quiet
+        self.probe = probe
+        self.waiting = None
+        self.session = session
+        self.timings = {}
+        self.seed = seed
 
         if idx is not None:
             color = COLORS[self.idx % len(COLORS)]
@@ -74,11 +102,20 @@ class Robot:
         else:
             self.id_prefix = ''
 
+    @asynccontextmanager
+    async def client(self):
+        """Shared session if robot was given one, own one otherwise"""
+        if self.session is not None:
+            yield self.session
+        else:
+            async with ClientSession() as session:
+                yield session
+
     async def newgame(self, ):
-        session = ClientSession()
-        ng = message.Newgame(name=self.name, numwords=self.numwords, timer=self.timer)
-        resp = await session.post(f'{self.uri}/games', data=json.dumps(ng.data(), ensure_ascii=False))
-        gm = message.ServerMessage().msg(await resp.json())
+        ng = message.Newgame(name=self.name, numwords=self.numwords, timer=self.timer, seed=self.seed)
+        async with self.client() as session:
+            async with session.post(f'{self.uri}/games', data=json.dumps(ng.data(), ensure_ascii=False)) as resp:
+                gm = message.ServerMessage().msg(await resp.json())
         if type(gm) == message.Error:
             raise ValueError(gm.message)
         elif type(gm) != message.Game:
@@ -89,13 +126,12 @@ class Robot:
         self.numwords = gm.numwords
         self.timer = gm.timer
         self.just_created = True
-        await session.close()
         return self.id
 
     async def checkgame(self, id=None):
-        session = ClientSession()
-        resp = await session.get(f'{self.uri}/games/{id}')
-        gm = message.ServerMessage.msg(await resp.json())
+        async with self.client() as session:
+            async with session.get(f'{self.uri}/games/{id}') as resp:
+                gm = message.ServerMessage.msg(await resp.json())
         if type(gm) == message.Error:
             raise ValueError(gm.message)
         elif type(gm) != message.Game:
@@ -106,40 +142,46 @@ class Robot:
         self.numwords = gm.numwords
         self.timer = gm.timer
         self.just_created = None
-        await session.close()
         return self.id
 
     async def run(self, pnum=None):
         self.logM(f"Playing game #{self.id} '{self.name}'")
-        session = ClientSession()
+        self.timings['start'] = time.perf_counter()
 
-        self.ws = await session.ws_connect(f'{self.uri}/ws/{self.id}')
+        async with self.client() as session:
+            self.ws = await session.ws_connect(f'{self.uri}/ws/{self.id}')
+            self.timings['connect'] = time.perf_counter()
 
-        listener = ensure_future(self.receive())
+            listener = ensure_future(self.receive())
 
-        if pnum and self.reset:
-            await self.send_msg(message.Reset())
-            await self.send_msg(message.Setup(name=self.name, numwords=self.numwords, timer=self.timer))
+            if pnum and self.reset:
+                await self.send_msg(message.Reset())
+                await self.send_msg(message.Setup(name=self.name, numwords=self.numwords, timer=self.timer))
 
-        await self.setup()
+            await self.setup()
+            self.timings['setup'] = time.perf_counter()
 
-        if pnum:
-            self.logM(f'Waiting until other {pnum - 1} players connected')
-            while len([p for p, v in self.players.items() if v.words > 0]) < pnum:
-                await self.wait_msg(message.Prepare)
+            if pnum:
+                self.logM(f'Waiting until other {pnum - 1} players connected')
+                while len([p for p, v in self.players.items() if v.words > 0]) < pnum and not self.finish:
+                    await self.wait_msg(message.Prepare, message.Joined, message.Updated, message.Left)
 
-            self.logM(f'All players ready - starting the game')
-            await self.send_msg(message.Play())
+                if not self.finish:
+                    self.logM(f'All players ready - starting the game')
+                    await self.send_msg(message.Play())
+                    self.timings['play'] = time.perf_counter()
 
-        await self.play()
-        await self.send_msg(message.Close())
+            await self.play()
+            await self.send_msg(message.Close())
 
-        listener.cancel()
-        await session.close()
+            listener.cancel()
+            await self.ws.close()
 
         return self.finish.results
 
     def log(self, color, message, *args):
+        if self.quiet and color != COLOR_ERROR:
+            return
         log.info(self.id_prefix + color + message + COLOR_RESET, *args)
 
     def logS(self, message, *args):
@@ -158,8 +200,12 @@ class Robot:
         self.logE(f'Error: {message}')
 
     async def send_msg(self, msg):
-        self.logC(f'>> {json.dumps(msg.data(), ensure_ascii=False)}')
-        await self.ws.send_json(msg.data())
+        data = msg.data()
+        if self.probe is not None:
+            self.waiting = self.probe.send(data['cmd'])
+        if not self.quiet:
+            self.logC(f'>> {json.dumps(data, ensure_ascii=False)}')
+        await self.ws.send_json(data)
 
     async def receive(self):
         while True:
@@ -168,7 +214,8 @@ class Robot:
             if tmsg.type == WSMsgType.text:
                 try:
                     data = json.loads(tmsg.data)
-                    self.logS(f'<< {json.dumps(data, ensure_ascii=False)}')
+                    if not self.quiet:
+                        self.logS(f'<< {json.dumps(data, ensure_ascii=False)}')
                 except Exception as e:
                     self.error(f'Broken message received {e}')
                     continue
@@ -179,21 +226,25 @@ class Robot:
                 else:
                     cmdtxt = data['cmd']
 
+                if self.probe is not None and self.probe.receive(cmdtxt, self.waiting):
+                    self.waiting = None
+
                 try:
                     msg = message.ServerMessage.msg(data)
-                    if isinstance(msg, message.Prepare):
-                        self.players = msg.players
+                    if isinstance(msg, (message.Prepare, message.Joined, message.Updated, message.Left)):
+                        self.roster(msg)
                     elif isinstance(msg, message.Tour):
                         self.tour = msg
                     elif isinstance(msg, message.Turn):
                         self.turn = msg
                     elif isinstance(msg, message.Finish):
                         self.finish = msg
+                        self.wakeup()
                         return
-                    elif isinstance(msg, message.Explained) or isinstance(msg, message.Missed):
+                    elif isinstance(msg, (message.Explained, message.Missed, message.Score)):
                         continue
 
-                    self.queue.append(msg)
+                    self.put_msg(msg)
 
                 except Exception as e:
                     log.exception(f"Exception caught while parsing of '{cmdtxt}': {e}")
@@ -206,32 +257,73 @@ class Robot:
 
         self.logE('Websocket closed unexpectedly')
         self.finish = message.Finish()
+        self.wakeup()
 
         return None
 
-    async def wait_msg(self, cls):
-        while True and not self.finish:
-            for m in self.queue:
-                if type(m) == cls:
-                    self.queue.remove(m)
-                    return m
-
-            await sleep(0.1)
+    def roster(self, msg):
+        """Apply full players snapshot or roster delta"""
+        if isinstance(msg, message.Prepare):
+            self.players = msg.players
+            self.roster_version = msg.version or 0
+            return
+
+        if msg.version is not None and msg.version <= self.roster_version:
+            return  # already seen in snapshot
+        self.roster_version = msg.version or self.roster_version
+
+        if isinstance(msg, message.Joined):
+            self.players[msg.name] = message.UserInfo(msg.words, msg.avatar)
+        elif isinstance(msg, message.Updated) and msg.name in self.players:
+            self.players[msg.name] = self.players[msg.name]._replace(words=msg.words)
+        elif isinstance(msg, message.Left):
+            self.players.pop(msg.name, None)
+
+    def put_msg(self, msg):
+        """Keep message for wait_msg() / get_msg_if_any(), wake robot waiting for it"""
+        q = self.inbox.get(type(msg))
+        if q is None:
+            q = self.inbox[type(msg)] = deque()
+        q.append(msg)
+
+        for fut in self.waiters.pop(type(msg), ()):
+            if not fut.done():
+                fut.set_result(None)
+
+    def wakeup(self):
+        """Wake all waiting, game is finished"""
+        waiters, self.waiters = self.waiters, {}
+        for futs in waiters.values():
+            for fut in futs:
+                if not fut.done():
+                    fut.set_result(None)
+
+    async def wait_msg(self, *classes):
+        """Oldest message of the first of classes having one, None if game is finished"""
+        while not self.finish:
+            for cls in classes:
+                q = self.inbox.get(cls)
+                if q:
+                    return q.popleft()
+
+            fut = get_event_loop().create_future()
+            for cls in classes:
+                self.waiters.setdefault(cls, []).append(fut)
+            try:
+                await fut
+            finally:  # woken by one of classes, the rest still list it
+                for cls in classes:
+                    futs = self.waiters.get(cls)
+                    if futs and fut in futs:
+                        futs.remove(fut)
 
     async def has_msg(self, cls):
-        for m in self.queue:
-            if type(m) == cls:
-                return m
-
-        return None
+        q = self.inbox.get(cls)
+        return q[0] if q else None
 
     async def get_msg_if_any(self, cls):
-        for m in self.queue:
-            if type(m) == cls:
-                self.queue.remove(m)
-                return m
-
-        return None
+        q = self.inbox.get(cls)
+        return q.popleft() if q else None
 
     async def setup(self):
         await self.send_msg(
@@ -267,21 +359,15 @@ class Robot:
                 await self.send_msg(message.Ready())
                 await self.wait_msg(message.Start)
 
-                nw = None
                 while True:
-                    st = await self.get_msg_if_any(message.Stop)
-                    nw = await self.get_msg_if_any(message.Next)
-
-                    if st:
+                    st = await self.wait_msg(message.Stop, message.Next)
+                    if st is None or isinstance(st, message.Stop):
                         break
 
-                    if nw:
-                        await self.answer()
-                        nw = None
-                    else:
-                        await sleep(0.1)
+                    await self.answer()
+                self.inbox.pop(message.Next, None)  # word sent just before stop
 
-                if st.reason == 'timer':
+                if st and st.reason == 'timer':
                     await self.answer()  # last answer, after timeout
 
             elif self.turn.guess == self.pname:
@@ -20,8 +20,8 @@ class Words:
         if self._words is None:
             raise ValueError("Can't load words")
 
-    def get_random_word(self):
-        return self._words[random.randrange(0, len(self._words))].title()
+    def get_random_word(self, rng: random.Random = None):
+        return self._words[(rng or random).randrange(0, len(self._words))].title()
 
 
 dictdir = Path(__file__).parent.parent.absolute()
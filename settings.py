@@ -21,3 +21,20 @@ SITE_PORT = env.str('PORT', default='8088')
 NEED_CORS = env.bool('CORS', default=False)
 
 GAME_INACTIVITY_TTL = 3600  # in seconds = 1 hour
+EXPIRE_INTERVAL = 60  # in seconds, how often expired games are looked for
+SCORE_INTERVAL = 1  # in seconds, live scoreboard updates are coalesced within interval
+LOBBY_INTERVAL = 0.5  # in seconds, changes of games sent to lobby subscribers are coalesced within interval
+LOBBY_RATE = 20  # max lobby messages per second to one subscriber
+SEND_TIMEOUT = 5  # in seconds, single socket send timeout
+OUTBOX_SIZE = env.int('OUTBOX_SIZE', default=64)  # max messages queued per socket
+OUTBOX_POLICY = env.str('OUTBOX_POLICY', default='drop')  # on overflow: drop / disconnect / lag
+EVENTLOG_DIR = env.str('EVENTLOG_DIR', default='')  # games event log directory, empty - disabled
+EVENTLOG_FSYNC = env.bool('EVENTLOG_FSYNC', default=False)  # fsync each written batch of events
+EVENTLOG_BATCH = 0.05  # in seconds, events are written in batches collected within interval
+EVENTLOG_SNAPSHOT = 300  # in seconds, how often snapshot of all games starts new log segment
+SNAPSHOT_FILE = env.str('SNAPSHOT_FILE', default='')  # games saved on shutdown and loaded on startup, if no event log
+WORKERS = env.int('WORKERS', default=1)  # worker processes, each game is served by one of them
+WORKER_PORT = env.int('WORKER_PORT', default=int(SITE_PORT) + 1)  # private ports of workers start from
+TRANSPORT = env.str('TRANSPORT', default='')  # players of other worker games: '' - proxied, 'ipc' - unix sockets
+RECORD_DIR = env.str('RECORD_DIR', default='')  # commands and frames of new games are recorded to, empty - disabled
+TRANSPORT_DIR = env.str('TRANSPORT_DIR', default='/tmp/thehat')  # unix sockets of workers for 'ipc' transport
@@ -1,45 +1,106 @@
+from array import array
+
+try:
+    import numpy as np  # optional, speeds up full recalculation
+except ImportError:
+    np = None
+
+
 class Results:
+    """Score tables kept in flat arrays, updated incrementally by add()"""
+
     def __init__(self, number_players, number_tours):
         self.number_players = number_players
         self.number_tours = number_tours
 
-        # main_table[i_tour][i_exp][i_gss] = number explained words by pair(i_exp, i_gss) in i_tour
-        self.main_table = None
-        # explained_table[i_tour][i_exp] = number explained words by i_exp in i_tour
-        self.explained_table = None
-        # guessed_table[i_tour][i_gss] = number guessed words by i_gss in i_tour
-        self.guessed_table = None
+        # main[(i_tour * n + i_exp) * n + i_gss] = number explained words by pair(i_exp, i_gss) in i_tour
+        self.__main = None
+        # explained[i_tour * n + i_exp] = number explained words by i_exp in i_tour
+        self.__explained = None
+        # guessed[i_tour * n + i_gss] = number guessed words by i_gss in i_tour
+        self.__guessed = None
 
-        # total_score[i] = number of guessed and explained words by i
-        self.total_score = None
         # explained_score[i] = number of explained words by i
-        self.explained_score = None
+        self.__explained_score = None
         # guessed_score[i] = number of guessed words by i
-        self.guessed_score = None
+        self.__guessed_score = None
 
         self.reset()
 
     def reset(self):
-        self.main_table = \
-            [[[0] * self.number_players for i in range(self.number_players)] for j in range(self.number_tours)]
-        self.explained_table = [[0] * self.number_players for i in range(self.number_tours)]
-        self.guessed_table = [[0] * self.number_players for i in range(self.number_tours)]
+        n, t = self.number_players, self.number_tours
+        self.__main = array('l', [0]) * (t * n * n)
+        self.__explained = array('l', [0]) * (t * n)
+        self.__guessed = array('l', [0]) * (t * n)
+        self.__explained_score = array('l', [0]) * n
+        self.__guessed_score = array('l', [0]) * n
 
-        self.total_score = [0] * self.number_players
-        self.explained_score = [0] * self.number_players
-        self.guessed_score = [0] * self.number_players
+    def add(self, tour, explaining, guessing, number_explained):
+        """Account explanation of pair in tour, O(1), negative number reverts explanation"""
+        n = self.number_players
+        self.__main[(tour * n + explaining) * n + guessing] += number_explained
+        self.__explained[tour * n + explaining] += number_explained
+        self.__guessed[tour * n + guessing] += number_explained
+        self.__explained_score[explaining] += number_explained
+        self.__guessed_score[guessing] += number_explained
 
     def calculate(self, tours):
+        """Recalculate all tables from scratch"""
         self.reset()
-        for t in range(self.number_tours):
-            for e in tours[t].explanations:
-                self.main_table[t][e.pair.explaining][e.pair.guessing] += e.number_explained
-
-        for t in range(self.number_tours):
-            for i in range(self.number_players):
-                for j in range(self.number_players):
-                    self.explained_table[t][i] += self.main_table[t][i][j]
-                    self.guessed_table[t][i] += self.main_table[t][j][i]
-                self.explained_score[i] += self.explained_table[t][i]
-                self.guessed_score[i] += self.guessed_table[t][i]
-                self.total_score[i] += self.explained_table[t][i] + self.guessed_table[t][i]
+        n, t = self.number_players, self.number_tours
+
+        if np is None:
+            for ti, tour in enumerate(tours[:t]):
+                for e in tour.explanations:
+                    self.add(ti, e.pair.explaining, e.pair.guessing, e.number_explained)
+            return
+
+        idx, num = [], []
+        for ti, tour in enumerate(tours[:t]):
+            for e in tour.explanations:
+                idx.append((ti * n + e.pair.explaining) * n + e.pair.guessing)
+                num.append(e.number_explained)
+
+        main = np.bincount(np.array(idx, dtype=np.int64), weights=np.array(num, dtype=np.int64),
+                           minlength=t * n * n).astype(np.int64).reshape(t, n, n)
+        explained = main.sum(axis=2)
+        guessed = main.sum(axis=1)
+
+        self.__main = array('l', main.ravel().tolist())
+        self.__explained = array('l', explained.ravel().tolist())
+        self.__guessed = array('l', guessed.ravel().tolist())
+        self.__explained_score = array('l', explained.sum(axis=0).tolist())
+        self.__guessed_score = array('l', guessed.sum(axis=0).tolist())
+
+    def score(self, i):
+        """(total, explained, guessed) score of player i, O(1)"""
+        e, g = self.__explained_score[i], self.__guessed_score[i]
+        return e + g, e, g
+
+    def __rows(self, a, width):
+        return [a[i:i + width].tolist() for i in range(0, len(a), width)]
+
+    @property
+    def main_table(self):
+        n = self.number_players
+        return [self.__rows(self.__main[t * n * n:(t + 1) * n * n], n) for t in range(self.number_tours)]
+
+    @property
+    def explained_table(self):
+        return self.__rows(self.__explained, self.number_players)
+
+    @property
+    def guessed_table(self):
+        return self.__rows(self.__guessed, self.number_players)
+
+    @property
+    def total_score(self):
+        return [e + g for e, g in zip(self.__explained_score, self.__guessed_score)]
+
+    @property
+    def explained_score(self):
+        return self.__explained_score.tolist()
+
+    @property
+    def guessed_score(self):
+        return self.__guessed_score.tolist()
@@ -0,0 +1,39 @@
+from functools import lru_cache
+from types import SimpleNamespace
+
+from shlyapa.pair import Pair
+
+
+def period(number_players):
+    """Pairing algorithms depend on turn only through round shift, which repeats each n * (n - 1) turns"""
+    return number_players * max(number_players - 1, 1)
+
+
+class Schedule:
+    """Sequence of pairs produced by pairing algorithm, materialized on demand
+
+    Starts from `start` pair played on turn `phase` (turn modulo period), pair(i)
+    is the pair playing i turns after start
+    """
+
+    def __init__(self, alg, number_players, start, phase):
+        self.alg = alg
+        self.number_players = number_players
+        self.phase = phase
+        self.__config = SimpleNamespace(number_players=number_players)
+        self.__pairs = [start]
+
+    def __len__(self):
+        return len(self.__pairs)
+
+    def pair(self, i) -> Pair:
+        pairs = self.__pairs
+        while len(pairs) <= i:
+            pairs.append(self.alg.get_next_pair(self.__config, pairs[-1], self.phase + len(pairs) - 1))
+        return pairs[i]
+
+
+@lru_cache(maxsize=256)
+def get_schedule(alg, number_players, explaining, guessing, phase) -> Schedule:
+    """Shared schedule for (algorithm, number of players) starting from given pair and turn phase"""
+    return Schedule(alg, number_players, Pair(explaining, guessing), phase)
@@ -1,6 +1,7 @@
 from shlyapa.config import Config
 from shlyapa.pair import Pair
 from shlyapa.results import Results
+from shlyapa.schedule import (get_schedule, period)
 import random
 
 
@@ -50,6 +51,44 @@ class Shlyapa:
         self.__number_explained_words = 0
         self.__alg = self.config.type()
         self.__next_pair = self.__alg.get_start_pair(self.config)
+        # cached pairing schedule and turn of its first pair
+        self.__schedule = None
+        self.__schedule_base = 0
+
+    def __getstate__(self):
+        """Compact state: tours as plain tuples, results and pairing schedule are rebuilt on load"""
+        c = self.config
+        return ((c.type, c.number_players, c.number_words, c.number_tours, c.is_last_turn_in_tour_divisible),
+                (self.__results.number_players, self.__results.number_tours),
+                [(t.number_words, [(e.pair.explaining, e.pair.guessing, e.number_explained) for e in t.explanations])
+                 for t in self.__tours],
+                self.__cur_turn,
+                (self.__next_pair.explaining, self.__next_pair.guessing),
+                self.__number_explained_words)
+
+    def __setstate__(self, state):
+        config, results, tours, self.__cur_turn, next_pair, self.__number_explained_words = state
+        self.config = Config(*config)
+        self.__alg = self.config.type()
+        self.__next_pair = Pair(*next_pair)
+        self.__schedule = None
+        self.__schedule_base = 0
+
+        self.__results = Results(*results)
+        self.__tours = []
+        add = self.__results.add
+        for ti, (number_words, explanations) in enumerate(tours):
+            tour = Shlyapa.Tour(number_words)
+            for e, g, number_explained in explanations:
+                # stored indexes are ints already, no need for checks of constructors
+                pair = Pair.__new__(Pair)
+                pair.explaining, pair.guessing = e, g
+                explanation = Shlyapa.Explanation.__new__(Shlyapa.Explanation)
+                explanation.pair, explanation.number_explained = pair, number_explained
+                tour.explanations.append(explanation)
+                tour.number_explained_words += number_explained
+                add(ti, e, g, number_explained)
+            self.__tours.append(tour)
 
     def __add_explanation(self, explanation, is_fiction=False):
         if self.is_end():
@@ -62,6 +101,8 @@ class Shlyapa:
             self.__tours.append(Shlyapa.Tour(self.config.number_words))
 
         self.__tours[-1].add_explanation(explanation)
+        self.__results.add(len(self.__tours) - 1,
+                           explanation.pair.explaining, explanation.pair.guessing, explanation.number_explained)
         if not is_fiction:
             self.__cur_turn += 1
         self.__number_explained_words += explanation.number_explained
@@ -70,7 +111,10 @@ class Shlyapa:
         if self.is_new():
             return
 
-        last_number_explained_words = self.__tours[-1].explanations[-1].number_explained
+        last = self.__tours[-1].explanations[-1]
+        last_number_explained_words = last.number_explained
+        self.__results.add(len(self.__tours) - 1,
+                           last.pair.explaining, last.pair.guessing, -last_number_explained_words)
 
         self.__tours[-1].pop_explanation()
 
@@ -112,8 +156,13 @@ class Shlyapa:
         return self.__next_pair
 
     def calculate_results(self):
+        """Recalculate results from scratch, results are also kept up to date by each move"""
         self.__results.calculate(self.__tours)
 
+    def get_score_results(self, i):
+        """(total, explained, guessed) score of player i at the moment"""
+        return self.__results.score(i)
+
     def reset_results(self):
         self.__results.reset()
 
@@ -147,8 +196,28 @@ class Shlyapa:
     def is_round_new(self):
         return self.__cur_turn % self.config.number_players == 0
 
+    def __following_pair(self):
+        """Pair for the turn after current one, looked up in cached pairing schedule
+
+        Schedule is rebuilt from current pair if number of players or algorithm was changed
+        or current pair does not match it (e.g. after return_shlyapa)
+        """
+        turn = self.__cur_turn
+        n = self.config.number_players
+        sch = self.__schedule
+        i = turn - self.__schedule_base
+
+        if sch is None or sch.number_players != n or sch.alg is not self.config.type or i < 0 \
+                or sch.pair(i) != self.__next_pair:
+            sch = self.__schedule = get_schedule(
+                self.config.type, n, self.__next_pair.explaining, self.__next_pair.guessing, turn % period(n))
+            self.__schedule_base = turn
+            i = 0
+
+        return sch.pair(i + 1)
+
     def move_shlyapa(self, pair_explained_words=0):
-        next_next_pair = self.__alg.get_next_pair(self.config, self.__next_pair, self.__cur_turn)
+        next_next_pair = self.__following_pair()
         if self.config.is_last_turn_in_tour_divisible and \
                 self.config.number_words - self.get_number_explained_in_cur_tour() < pair_explained_words \
                 <= self.config.number_words - self.get_number_explained_in_cur_tour() + \
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Headless bulk simulation of shlyapa games, collects fairness statistics
+of pairing algorithms for choosing defaults for big groups
+"""
+from concurrent.futures import (ProcessPoolExecutor, as_completed)
+import getopt
+import json
+import os
+import random
+import sys
+from typing import (List, Optional)
+
+from shlyapa.config import Config
+from shlyapa.shlyapa import Shlyapa
+
+
+class Stats:
+    """Fairness statistics summed over games, see means()"""
+
+    FIELDS = ('turns', 'explain_spread', 'guess_spread', 'pair_coverage', 'score_variance')
+
+    def __init__(self):
+        self.games = 0
+        self.sums = dict([(f, 0.0) for f in Stats.FIELDS])
+        self.max_explain_spread = 0
+
+    def add_game(self, s: Shlyapa, explain: List[int], guess: List[int], pairs: set):
+        n = s.config.number_players
+        score = s.get_total_score_results()[:n]
+        mean = sum(score) / n
+
+        self.games += 1
+        self.sums['turns'] += s.get_cur_turn()
+        self.sums['explain_spread'] += max(explain) - min(explain)
+        self.sums['guess_spread'] += max(guess) - min(guess)
+        self.sums['pair_coverage'] += len(pairs) / (n * (n - 1))
+        self.sums['score_variance'] += sum((x - mean) ** 2 for x in score) / n
+        self.max_explain_spread = max(self.max_explain_spread, max(explain) - min(explain))
+
+    def merge(self, other: 'Stats'):
+        self.games += other.games
+        for f in Stats.FIELDS:
+            self.sums[f] += other.sums[f]
+        self.max_explain_spread = max(self.max_explain_spread, other.max_explain_spread)
+
+    def means(self) -> dict:
+        return dict([(f, round(v / self.games, 4) if self.games else 0) for f, v in self.sums.items()])
+
+
+def play(cfg: Config, rng: random.Random, explain_max: int, stats: Stats):
+    """Play one synthetic game, pair explains random number of words in each turn"""
+    n = cfg.number_players
+    explain = [0] * n
+    guess = [0] * n
+    pairs = set()
+
+    s = Shlyapa(config=cfg)
+    total = cfg.number_tours * cfg.number_words
+    while not s.is_end():
+        p = s.get_next_pair()
+        explain[p.explaining] += 1
+        guess[p.guessing] += 1
+        pairs.add((p.explaining, p.guessing))
+
+        if cfg.is_last_turn_in_tour_divisible:
+            left = total - s.get_cur_number_explained()
+        else:
+            left = cfg.number_words - s.get_number_explained_in_cur_tour()
+        s.move_shlyapa(pair_explained_words=min(left, rng.randint(0, explain_max)))
+
+    stats.add_game(s, explain, guess, pairs)
+
+
+def simulate_chunk(alg: str, players: int, words: int, tours: int, divisible: bool,
+                   explain_max: int, games: int, seed: int) -> Stats:
+    """Simulate `games` games with same settings, runs in worker process"""
+    rng = random.Random(seed)
+    stats = Stats()
+    for _ in range(games):
+        cfg = Config(
+            type=alg,
+            number_players=players,
+            number_words=players * words,
+            number_tours=tours,
+            is_last_turn_in_tour_divisible=divisible)
+        play(cfg, rng, explain_max, stats)
+    return stats
+
+
+class Options:
+
+    algs: List[str]
+    players: List[int]
+    words: int
+    tours: int
+    divisible: bool
+    explain_max: int
+    games: int
+    chunk: int
+    jobs: int
+    seed: Optional[int]
+
+    @staticmethod
+    def usage(err=None):
+        if err:
+            print(f'Error: {err}', file=sys.stderr)
+
+        print(f"""
+USAGE:
+    {sys.argv[0]} [<flags>]
+Flags:
+    -h, --help              Help (this)
+    -a, --alg <alg,...>     Pairing algorithms ORIGINAL, AVA, AVAF (default: all)
+    -p, --players <n,...>   Numbers of players (default: 4,6,10)
+    -w, --words <num>       Words per player (default: 6)
+    -t, --tours <num>       Number of tours (default: 3)
+    -d, --divisible         Last turn in tour is divisible
+    -e, --explain <num>     Max words explained per turn, random 0..<num> (default: 3)
+    -g, --games <num>       Games per algorithm and number of players (default: 10000)
+    -c, --chunk <num>       Games per worker task (default: 1000)
+    -j, --jobs <num>        Worker processes (default: number of CPUs)
+    -s, --seed <num>        Random seed
+""", file=sys.stderr)
+        sys.exit(1)
+
+    def __init__(self, argv):
+        self.algs = ['ORIGINAL', 'AVA', 'AVAF']
+        self.players = [4, 6, 10]
+        self.words = 6
+        self.tours = 3
+        self.divisible = False
+        self.explain_max = 3
+        self.games = 10000
+        self.chunk = 1000
+        self.jobs = os.cpu_count() or 1
+        self.seed = None
+
+        try:
+            opts, args = getopt.getopt(argv[1:], "ha:p:w:t:de:g:c:j:s:", [
+                'help', 'alg=', 'players=', 'words=', 'tours=', 'divisible',
+                'explain=', 'games=', 'chunk=', 'jobs=', 'seed='
+            ])
+        except getopt.GetoptError as err:
+            Options.usage(err)
+            return
+
+        for o, a in opts:
+            if o in ("-h", "--help"):
+                Options.usage()
+            elif o in ("-a", "--alg"):
+                self.algs = [x.upper() for x in a.split(',')]
+            elif o in ("-p", "--players"):
+                self.players = [int(x) for x in a.split(',')]
+            elif o in ("-w", "--words"):
+                self.words = int(a)
+            elif o in ("-t", "--tours"):
+                self.tours = int(a)
+            elif o in ("-d", "--divisible"):
+                self.divisible = True
+            elif o in ("-e", "--explain"):
+                self.explain_max = int(a)
+            elif o in ("-g", "--games"):
+                self.games = int(a)
+            elif o in ("-c", "--chunk"):
+                self.chunk = int(a)
+            elif o in ("-j", "--jobs"):
+                self.jobs = int(a)
+            elif o in ("-s", "--seed"):
+                self.seed = int(a)
+            else:
+                Options.usage(f"unhandled option {o}")
+
+        if args:
+            Options.usage('No arguments expected')
+
+
+def main():
+    opts = Options(sys.argv)
+    rng = random.Random(opts.seed)
+
+    tasks = []
+    for alg in opts.algs:
+        for players in opts.players:
+            if alg == 'ORIGINAL' and players % 2:
+                continue  # original game needs even number of players
+            for done in range(0, opts.games, opts.chunk):
+                tasks.append((alg, players, opts.words, opts.tours, opts.divisible, opts.explain_max,
+                              min(opts.chunk, opts.games - done), rng.getrandbits(64)))
+
+    totals = {}
+    with ProcessPoolExecutor(max_workers=opts.jobs) as pool:
+        futures = dict([(pool.submit(simulate_chunk, *t), t[:2]) for t in tasks])
+        for f in as_completed(futures):
+            alg, players = futures[f]
+            stats = totals.setdefault((alg, players), Stats())
+            stats.merge(f.result())
+
+            # one line per finished chunk, with running totals for its settings
+            print(json.dumps({'alg': alg, 'players': players, 'games': stats.games,
+                              'max_explain_spread': stats.max_explain_spread, **stats.means()}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import asyncio
+
+from game.clock import Clock
+
+
+async def test_cached_per_tick():
+    c = Clock()
+    t1 = c.now()
+    assert c.now() == t1  # same tick
+
+    await asyncio.sleep(0.01)
+    t2 = c.now()
+    assert t2 > t1
+
+
+def test_no_loop():
+    c = Clock()
+    assert c.now() <= c.now()
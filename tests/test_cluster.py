@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app import make_app
+from game.cluster import (Cluster, DEFAULT_ID, owner)
+
+
+def test_owner():
+    c = Cluster(1, 3, port=9000)
+    assert c.peers == ['http://127.0.0.1:9000', 'http://127.0.0.1:9001', 'http://127.0.0.1:9002']
+    assert owner(DEFAULT_ID, 3) == owner(DEFAULT_ID, 3)
+    for _ in range(10):
+        assert owner(c.new_id(), 3) == 1
+
+
+@pytest.fixture()
+async def workers(aiohttp_server, aiohttp_client):
+    """Two workers in process, each one is reached through its own client"""
+    peers = [None, None]
+    apps = [make_app(Cluster(i, 2, peers=peers)) for i in range(2)]
+    servers = [await aiohttp_server(app) for app in apps]
+    for i, s in enumerate(servers):
+        peers[i] = str(s.make_url('')).rstrip('/')
+    return apps, [await aiohttp_client(s) for s in servers]
+
+
+async def test_routing(workers):
+    apps, clients = workers
+
+    r = await clients[0].post('/games', json={'cmd': 'newgame', 'name': 'Affinity'})
+    gid = (await r.json())['id']
+    assert gid in apps[0].games and gid not in apps[1].games
+
+    r = await clients[1].get(f'/games/{gid}')  # proxied to owner
+    assert (await r.json())['name'] == 'Affinity'
+
+    r = await clients[1].get('/games', params={'name': 'affinity'})  # gathered from all workers
+    assert [g['id'] for g in await r.json()] == [gid]
+
+    ws = await clients[1].ws_connect(f'/ws/{gid}')
+    await ws.send_json({'cmd': 'name', 'name': 'user1'})
+    assert (await ws.receive_json())['cmd'] == 'game'
+    assert 'user1' in apps[0].games[gid].players_map
+    await ws.close()
+
+
+async def test_default_game(workers):
+    apps, clients = workers
+    assert [DEFAULT_ID in app.games for app in apps] == [owner(DEFAULT_ID, 2) == i for i in range(2)]
+
+    r = await clients[0].get('/games')
+    assert DEFAULT_ID in [g['id'] for g in await r.json()]
+
+
+async def test_list_pages(workers):
+    apps, clients = workers
+    for _ in range(3):
+        for c in clients:
+            await c.post('/games', json={'cmd': 'newgame', 'name': 'Paged'})
+    every = [g['id'] for g in await (await clients[0].get('/games', params={'name': 'paged'})).json()]
+    assert len(every) == 6
+
+    listed, cursor = [], ''
+    while cursor is not None:
+        r = await clients[1].get('/games', params={'name': 'paged', 'limit': 4, 'cursor': cursor})
+        page = [g['id'] for g in await r.json()]
+        assert len(page) <= 4
+        listed += page
+        cursor = r.headers.get('X-Next-Cursor')
+    assert listed == every
+
+    r = await clients[0].get('/games', params={'cursor': '1'})
+    assert r.status == 400
+
+
+async def test_lobby(workers):
+    apps, clients = workers
+    for app in apps:
+        app.lobby.interval = 0.01
+
+    ws = await clients[1].ws_connect('/lobby')
+    assert (await ws.receive_json())['cmd'] == 'lobby'
+
+    r = await clients[0].post('/games', json={'cmd': 'newgame', 'name': 'Remote'})
+    gid = (await r.json())['id']
+    while True:  # games of other worker follow snapshot
+        msg = await asyncio.wait_for(ws.receive_json(), 1)
+        if msg.get('id') == gid:
+            break
+    assert msg['cmd'] == 'game' and msg['name'] == 'Remote'
+
+    ws2 = await clients[1].ws_connect('/lobby')
+    snapshot = await ws2.receive_json()
+    assert sorted(g['id'] for g in snapshot['games']) == sorted(list(apps[0].games) + list(apps[1].games))
+
+    del apps[0].games[gid]
+    assert await asyncio.wait_for(ws.receive_json(), 1) == {'cmd': 'expire', 'id': gid}
+    await ws.close()
+    await ws2.close()
@@ -0,0 +1,77 @@
+import os
+
+from game.eventlog import EventLog
+from game.hat import HatGame
+from tests.test_game import MockWebSocket
+
+
+def state(g):
+    s = g.shlyapa
+    return (g.id, g.game_name, g.state, g.seq, list(g.hat), g.score,
+            [(p.name, p.state, p.words) for p in g.players],
+            s.get_cur_turn() if s else None,
+            g.turn.word if g.turn else None)
+
+
+async def login(g):
+    sockets = [MockWebSocket() for _ in range(3)]
+    for i, ws in enumerate(sockets):
+        await g.cmd(ws, {'cmd': 'name', 'name': f'user{i}'})
+        await g.cmd(ws, {'cmd': 'words', 'words': ['w1', 'w2']})  # padded with random words
+    return sockets
+
+
+async def play(g):
+    await g.cmd(g.players[0].socket, {'cmd': 'play'})
+    for p in (g.turn.explaining, g.turn.guessing):
+        await g.cmd(p.socket, {'cmd': 'ready'})
+    for guessed in (True, False, True):
+        await g.cmd(g.turn.explaining.socket, {'cmd': 'guessed', 'guessed': guessed})
+
+
+async def recover(path):
+    games = await EventLog(path).recover(HatGame)
+    for g in games.values():
+        g.cancel_timers()
+    return games
+
+
+async def test_recover(tmp_path):
+    journal = EventLog(str(tmp_path), interval=0)
+    g = HatGame()
+    g.start_journal(journal)
+    await login(g)
+    await play(g)
+    await journal.close()
+    g.cancel_timers()
+
+    games = await recover(str(tmp_path))
+    assert state(games[g.id]) == state(g)
+
+
+async def test_recover_snapshot(tmp_path):
+    journal = EventLog(str(tmp_path), interval=0)
+    g = HatGame()
+    g.start_journal(journal)
+    await login(g)
+
+    await journal.snapshot({g.id: g})
+    await play(g)
+    await journal.close()
+    g.cancel_timers()
+
+    assert sorted(os.listdir(tmp_path)) == ['events-000002.log', 'snapshot-000002.pickle']
+    games = await recover(str(tmp_path))
+    assert state(games[g.id]) == state(g)
+
+
+async def test_recover_deleted(tmp_path):
+    journal = EventLog(str(tmp_path), interval=0)
+    g1, g2 = HatGame(), HatGame()
+    g1.start_journal(journal)
+    g2.start_journal(journal)
+    await login(g1)
+    g1.record('delete')
+    await journal.close()
+
+    assert list(await recover(str(tmp_path))) == [g2.id]
@@ -0,0 +1,45 @@
+from unittest import TestCase
+from game.expiry import ExpiryIndex
+
+
+class FakeGame:
+    def __init__(self, gid, last_event_time):
+        self.id = gid
+        self.last_event_time = last_event_time
+
+
+class TestExpiryIndex(TestCase):
+
+    def test_expired(self):
+        t0 = 1000.0
+        idx = ExpiryIndex(60)
+        games = dict([(g.id, g) for g in (FakeGame('a', t0), FakeGame('b', t0), FakeGame('c', t0))])
+        for g in games.values():
+            idx.add(g)
+
+        assert idx.expired(games, t0 + 30) == []
+
+        games['b'].last_event_time = t0 + 50  # activity
+        del games['c']  # removed game
+
+        expired = idx.expired(games, t0 + 61)
+        assert [g.id for g in expired] == ['a']
+        assert len(idx) == 1  # 'b' refreshed, 'a' and 'c' dropped
+
+        assert idx.expired(games, t0 + 100) == []
+        assert [g.id for g in idx.expired(games, t0 + 111)] == ['b']
+        assert len(idx) == 0
+
+    def test_added_twice(self):
+        t0 = 1000.0
+        idx = ExpiryIndex(60)
+        games = {'a': FakeGame('a', t0)}
+        idx.add(games['a'])
+        games['a'] = FakeGame('a', t0 + 10)  # recovered game replaces one added before
+        idx.add(games['a'])
+        assert len(idx) == 1
+
+        assert idx.expired(games, t0 + 61) == []
+        assert [g.id for g in idx.expired(games, t0 + 71)] == ['a']
+        idx.add(games['a'])  # default game is added back after reset
+        assert len(idx) == 1
@@ -1,3 +1,5 @@
+import asyncio
+import pickle
 import pytest
 from unittest.mock import (AsyncMock, call)
 
@@ -7,7 +9,8 @@ from game.hat import HatGame
 
 class MockWebSocket():
     def __init__(self):
-        self.send_json = AsyncMock()
+        self.send_str = AsyncMock()
+        self.close = AsyncMock()
 
 
 @pytest.fixture()
@@ -54,8 +57,25 @@ async def test_broadcast(thegame):
     assert len(thegame.players)
     msg = message.Start()
     await thegame.broadcast(msg)
+    await thegame.flush()
     for p in thegame.players:
-        p.socket.send_json.assert_awaited_once_with(msg.data())
+        p.socket.send_str.assert_awaited_once_with(str(msg))
+
+
+async def test_broadcast_slow_socket(thegame, monkeypatch):
+    async def stall(frame):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr('settings.SEND_TIMEOUT', 0.01)
+    slow = thegame.players[0].socket
+    slow.send_str.side_effect = stall
+
+    msg = message.Start()
+    await asyncio.wait_for(thegame.broadcast(msg), 1)
+    await asyncio.wait_for(thegame.flush(), 1)
+    for p in thegame.players[1:]:
+        p.socket.send_str.assert_awaited_once_with(str(msg))
+    assert thegame.outbox_stats()[thegame.players[0].name]['dropped'] == 1
 
 
 def test_game_msg(thegame):
@@ -76,8 +96,8 @@ async def test_name_fail_connect():
         g.state = st
         await g.name(ws, m)
         e = message.Error(code=104, message="Can't login new user test1 while game in progress")
-        ws.send_json.assert_awaited_once_with(e.data())
-        ws.send_json.reset_mock()
+        ws.send_str.assert_awaited_once_with(str(e))
+        ws.send_str.reset_mock()
 
 
 async def test_name_connect_first():
@@ -87,10 +107,11 @@ async def test_name_connect_first():
 
     g.state = HatGame.ST_SETUP
     await g.name(ws, m)
-    print(ws.send_json.await_args_list)
-    ws.send_json.assert_has_awaits([
-        call(g.game_msg().data()),
-        call(message.Prepare(players={m.name: [0, None]}).data())
+    await g.flush()
+    print(ws.send_str.await_args_list)
+    ws.send_str.assert_has_awaits([
+        call(str(g.game_msg())),
+        call(str(message.Prepare(players={m.name: [0, None]}, version=1)))
     ], any_order=False)
 
 
@@ -104,10 +125,113 @@ async def test_name_connect_second():
 
     g.state = HatGame.ST_SETUP
     await g.name(ws2, m)
-    print(ws2.send_json.await_args_list)
-    pm = message.Prepare(players={m.name: [0, None], 'test1': [0, None]})
-    ws2.send_json.assert_has_awaits([
-        call(g.game_msg().data()),
-        call(pm.data())
+    await g.flush()
+    print(ws2.send_str.await_args_list)
+    pm = message.Prepare(players={'test1': [0, None], m.name: [0, None]}, version=2)
+    ws2.send_str.assert_has_awaits([
+        call(str(g.game_msg())),
+        call(str(pm))
     ], any_order=False)
-    ws1.send_json.assert_awaited_once_with(pm.data())
+    ws1.send_str.assert_awaited_once_with(str(message.Joined(name=m.name, words=0, version=2)))
+
+
+async def test_name_reconnect():
+    g = HatGame()
+    ws1 = MockWebSocket()
+    g.register_player(name="test1", socket=ws1)
+    g.register_player(name="test2", socket=MockWebSocket())
+
+    ws3 = MockWebSocket()
+    await g.name(ws3, message.Name(name='test1'))
+    await g.flush()
+    ws3.send_str.assert_has_awaits([
+        call(str(g.game_msg())),
+        call(str(message.Prepare(players={'test1': [0, None], 'test2': [0, None]}, version=2)))
+    ], any_order=False)
+    g.players_map['test2'].socket.send_str.assert_not_awaited()
+
+
+async def test_roster_deltas(thegame):
+    ws1 = thegame.players[0].socket
+    await thegame.words(ws1, message.Words(words=['a', 'b', 'c', 'd', 'e', 'f']))
+    await thegame.flush()
+    upd = message.Updated(name='user1', words=6, version=4)
+    for p in thegame.players:
+        p.socket.send_str.assert_awaited_once_with(str(upd))
+        p.socket.send_str.reset_mock()
+
+    ws3 = thegame.players[2].socket
+    await thegame.close(ws3)
+    await thegame.flush()
+    left = message.Left(name='user3', version=5)
+    for p in thegame.players:
+        p.socket.send_str.assert_awaited_once_with(str(left))
+    ws3.send_str.assert_not_awaited()
+
+
+async def test_cmd_unknown():
+    g = HatGame()
+    ws = MockWebSocket()
+
+    for data, code, txt in (
+            ({'cmd': 'unknown'}, 103, 'Unknown command unknown'),
+            ({'cmd': 'game'}, 103, 'Unknown command game'),  # server message
+            ({'cmd': 'newgame'}, 103, 'Unknown command newgame'),  # client message without handler
+            ({'name': 'test1'}, 102, "Invalid message format {'name': 'test1'} - cmd is not specified")):
+        await g.cmd(ws, data)
+        ws.send_str.assert_awaited_once_with(str(message.Error(code=code, message=txt)))
+        ws.send_str.reset_mock()
+
+
+async def test_cmd_dispatch():
+    g = HatGame()
+    ws = MockWebSocket()
+    await g.cmd(ws, {'cmd': 'name', 'name': 'test1'})
+    assert 'test1' in g.players_map
+    assert g.sockets_map[id(ws)].name == 'test1'
+
+
+async def start_game(g):
+    for p in g.players:
+        await g.words(p.socket, message.Words(words=[f'{p.name}-{i}' for i in range(g.num_words)]))
+    await g.play(g.players[0].socket, message.Play())
+    for p in (g.turn.explaining, g.turn.guessing):
+        await g.ready(p.socket, message.Ready())
+    await g.flush()
+
+
+async def test_live_score(thegame, monkeypatch):
+    monkeypatch.setattr('settings.SCORE_INTERVAL', 0.01)
+    g = thegame
+    await start_game(g)
+    exp, gss = g.turn.explaining, g.turn.guessing
+
+    await g.guessed(exp.socket, message.Guessed(guessed=True))
+    await g.guessed(exp.socket, message.Guessed(guessed=False))
+    await g.guessed(exp.socket, message.Guessed(guessed=True))
+
+    sb = g.scoreboard()
+    assert sb.players[exp.name] == [2, 2, 0]
+    assert sb.players[gss.name] == [2, 0, 2]
+    assert sb.tours == [2, 0, 0]
+    assert g.game_msg(score=True).score == sb.args()
+
+    await asyncio.sleep(0.05)
+    await g.flush()
+    for p in g.players:
+        sent = [c.args[0] for c in p.socket.send_str.await_args_list]
+        assert sent.count(str(sb)) == 1  # burst coalesced into one push
+
+
+async def test_seeded_game():
+    games = [HatGame(seed=11) for _ in range(2)]
+    for g in games:
+        await g.cmd(MockWebSocket(), {'cmd': 'name', 'name': 'user1'})
+        await g.cmd(g.players[0].socket, {'cmd': 'words', 'words': ['w1']})  # padded with random words
+
+    assert games[0].game_name == games[1].game_name
+    assert games[0].players[0].words == games[1].players[0].words
+    assert len(games[0].players[0].words) > 1
+
+    g = pickle.loads(pickle.dumps(games[0]))  # generator is not snapshotted, draws stay the same
+    assert g.draw_rng().random() == games[0].draw_rng().random()
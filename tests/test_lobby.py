@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+from app import make_app
+from game.hat import HatGame
+from game.lobby import Lobby
+from game.registry import GameRegistry
+from tests.test_game import MockWebSocket
+
+
+def frames(ws):
+    return [json.loads(c.args[0]) for c in ws.send_str.await_args_list]
+
+
+async def test_changes():
+    reg = GameRegistry()
+    g = HatGame(name='First')
+    reg[g.id] = g
+
+    lobby = Lobby(reg, interval=0.01, rate=1000)
+    ws = MockWebSocket()
+    lobby.subscribe(ws)
+    before = g.game_msg().args()
+
+    g2 = HatGame(name='Second')
+    reg[g2.id] = g2
+    for state in (HatGame.ST_PLAY, HatGame.ST_FINISH):  # burst, only latest state is sent
+        g.state = state
+    del reg[g2.id]
+    await asyncio.sleep(0.05)
+
+    sent = frames(ws)
+    assert sent[0] == {'cmd': 'lobby', 'games': [before]}
+    assert sorted(sent[1:], key=lambda m: m['cmd']) == [
+        {'cmd': 'expire', 'id': g2.id},
+        g.game_msg().data(),
+    ]
+    lobby.close()
+
+
+async def test_rate():
+    reg = GameRegistry()
+    lobby = Lobby(reg, interval=0.02, rate=100)  # two messages per round
+    ws = MockWebSocket()
+    lobby.subscribe(ws)
+
+    for i in range(5):
+        g = HatGame(name=f'game{i}')
+        reg[g.id] = g
+    await asyncio.sleep(0.03)
+    assert len(frames(ws)) == 3
+
+    await asyncio.sleep(0.06)
+    assert [m['name'] for m in frames(ws)[1:]] == [f'game{i}' for i in range(5)]
+
+    lobby.unsubscribe(ws)
+    assert not lobby.subscribers
+
+
+async def test_lobby_socket(aiohttp_client):
+    app = make_app()
+    app.lobby.interval = 0.01
+    client = await aiohttp_client(app)
+
+    ws = await client.ws_connect('/lobby')
+    snapshot = await ws.receive_json()
+    assert snapshot['cmd'] == 'lobby' and len(snapshot['games']) == len(app.games)
+
+    r = await client.post('/games', json={'cmd': 'newgame', 'name': 'Lobby'})
+    gid = (await r.json())['id']
+    msg = await ws.receive_json()
+    assert msg['cmd'] == 'game' and msg['id'] == gid and msg['name'] == 'Lobby'
+
+    await ws.close()
+    await asyncio.sleep(0.01)
+    assert not app.lobby.subscribers
@@ -49,6 +49,39 @@ class TestMessage(TestCase):
             assert message.Error.msg({"cmd": "unknown", "code": 123, "message": "The Error Message"})
         assert str(e.value) == f"Sent command 'unknown' does not match required class Error"
 
+    def test_schema(self):
+        assert message.Turn._fields == ('turn', 'explain', 'guess')
+        assert message.Start._fields == ()
+
+        m = message.Tour(tour=1)
+        assert not hasattr(m, '__dict__')
+        with pytest.raises(AttributeError):
+            m.unknown = 1
+
+        class Listed(message.ServerMessage):
+            items: message.List[str]
+
+        assert Listed(items=['a']).items == ['a']
+        assert Listed().items is None
+        with pytest.raises(ValueError) as e:
+            Listed(items='a')
+        assert str(e.value) == 'items attribute should be an array'
+
+    def test_optional_omitted(self):
+        g = message.Game(id="xxxx-id-here", state='play', score={'players': {}, 'tours': [0]})
+        assert g.data()['score'] == {'players': {}, 'tours': [0]}
+        assert g.data()['name'] is None  # not optional
+
+        g.score = None
+        assert 'score' not in g.data()
+        assert 'score' not in g.args()
+        assert message.ServerMessage.msg(g.data()) == g
+
+    def test_to_json_bytes(self):
+        m = message.Next(word='шляпа')
+        assert m.to_json_bytes() == str(m).encode()
+        assert json.loads(m.to_json_bytes()) == m.data()
+
 
 class TestServerMessage(TestCase):
 
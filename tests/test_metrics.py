@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from game import message
+from game.hat import HatGame
+from game.metrics import (Histogram, METRICS)
+from tests.test_game import MockWebSocket
+
+
+class TestHistogram(TestCase):
+
+    def test_percentile(self):
+        h = Histogram()
+        assert h.percentile(0.5) == 0.0
+
+        for ms in [0.05] * 90 + [3] * 9 + [700]:
+            h.observe(ms)
+
+        assert h.count == 100
+        assert h.percentile(0.5) == 0.1
+        assert h.percentile(0.95) == 5
+        assert h.percentile(0.99) == 5
+        assert h.percentile(1) == 700
+        assert h.data()['buckets'] == {'0.1': 90, '5': 9, '1000': 1}
+
+    def test_merge(self):
+        h, other = Histogram(), Histogram()
+        h.observe(1)
+        other.observe(30)
+        other.observe(0.2)
+        h.merge(other)
+
+        assert (h.count, h.max, h.total) == (3, 30, 31.2)
+        assert h.data()['buckets'] == {'0.25': 1, '1': 1, '50': 1}
+
+
+async def test_handler_metrics():
+    METRICS.reset()
+    g = HatGame()
+    ws = MockWebSocket()
+
+    await g.cmd(ws, {'cmd': 'name', 'name': 'test1'})
+    await g.cmd(ws, {'cmd': 'ready'})  # game is not started - error
+
+    data = METRICS.data()['commands']
+    assert data['name']['calls'] == 1
+    assert data['name']['errors'] == 0
+    assert data['game']['calls'] == 1  # called by name
+    assert data['ready']['calls'] == 1
+    assert data['ready']['errors'] == 1
+    assert data['ready']['latency']['count'] == 1
+    assert data['words']['calls'] == 0
+
+    await g.words(ws, message.Words(words=['a'] * 6))
+    assert METRICS.data()['commands']['words']['calls'] == 1
@@ -0,0 +1,93 @@
+import asyncio
+
+from game.outbox import Outbox
+from tests.test_game import MockWebSocket
+
+
+def blocked_socket():
+    ws = MockWebSocket()
+    gate = asyncio.Event()
+
+    async def send(frame):
+        await gate.wait()
+
+    ws.send_str.side_effect = send
+    return ws, gate
+
+
+async def test_put_drain():
+    ws = MockWebSocket()
+    ob = Outbox(ws, size=4, policy=Outbox.POLICY_DROP)
+    for i in range(3):
+        assert ob.put('next', f'frame{i}')
+    await ob.drain()
+    assert [c.args[0] for c in ws.send_str.await_args_list] == ['frame0', 'frame1', 'frame2']
+    assert ob.stats()['sent'] == 3
+    assert ob.stats()['depth'] == 0
+
+
+async def test_drop_superseded():
+    ws, gate = blocked_socket()
+    ob = Outbox(ws, size=2, policy=Outbox.POLICY_DROP)
+    ob.put('start', 'in-flight')
+    await asyncio.sleep(0)  # writer takes first frame
+    ob.put('prepare', 'prepare1')
+    ob.put('next', 'next1')
+    assert ob.put('prepare', 'prepare2')
+    assert ob.stats()['dropped'] == 1
+    assert len(ob) == 2
+
+    gate.set()
+    await ob.drain()
+    assert [c.args[0] for c in ws.send_str.await_args_list] == ['in-flight', 'next1', 'prepare2']
+
+
+async def test_other_cmd_not_dropped():
+    ws, gate = blocked_socket()
+    ob = Outbox(ws, size=3, policy=Outbox.POLICY_DROP)
+    ob.put('start', 'in-flight')
+    await asyncio.sleep(0)
+    for cmd in ('prepare', 'next', 'turn'):
+        ob.put(cmd, cmd)
+    assert not ob.put('joined', 'joined')  # would lose roster snapshot or turn
+    assert ob.closed
+    assert ob.stats()['dropped'] == 3
+
+
+async def test_drop_nothing_to_drop_disconnects():
+    ws, gate = blocked_socket()
+    ob = Outbox(ws, size=1, policy=Outbox.POLICY_DROP)
+    ob.put('start', 'in-flight')
+    await asyncio.sleep(0)
+    ob.put('next', 'next1')
+    assert not ob.put('next', 'next2')
+    assert ob.closed
+    await asyncio.sleep(0)
+    ws.close.assert_awaited_once()
+
+
+async def test_disconnect():
+    ws, gate = blocked_socket()
+    ob = Outbox(ws, size=1, policy=Outbox.POLICY_DISCONNECT)
+    ob.put('start', 'in-flight')
+    await asyncio.sleep(0)
+    ob.put('game', 'game1')
+    assert not ob.put('game', 'game2')
+    assert ob.closed
+    assert not ob.put('game', 'game3')
+
+
+async def test_lag():
+    ws, gate = blocked_socket()
+    ob = Outbox(ws, size=1, policy=Outbox.POLICY_LAG)
+    ob.put('start', 'in-flight')
+    await asyncio.sleep(0)
+    ob.put('next', 'next1')
+    assert ob.put('next', 'next2')
+    assert ob.stats()['lagging']
+    assert ob.stats()['dropped'] == 0
+
+    gate.set()
+    await ob.drain()
+    assert not ob.stats()['lagging']
+    assert ob.stats()['sent'] == 3
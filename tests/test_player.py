@@ -0,0 +1,54 @@
+from unittest import TestCase
+import pytest
+
+from game.player import (Player, MachineError)
+
+
+class TestPlayer(TestCase):
+
+    def test_constructor(self):
+        assert Player().state == Player.ST_UNKNOWN
+        p = Player(name='Explanee')
+        assert p.state == Player.ST_WORDS
+        assert p.name == 'Explanee'
+        assert p.words == []
+        assert not hasattr(p, '__dict__')
+
+    def test_turn(self):
+        p = Player(name='Explanee')
+        p.words = ['a', 'b']
+        assert p.state == Player.ST_WAIT
+        for trigger, state in (
+                ('begin', Player.ST_BEGIN),
+                ('ready', Player.ST_READY),
+                ('play', Player.ST_PLAY),
+                ('lastanswer', Player.ST_LAST_ANSWER),
+                ('finish', Player.ST_FINISH),
+                ('wait', Player.ST_WAIT),
+                ('wait', Player.ST_WAIT),
+                ('reset', Player.ST_WORDS)):
+            assert getattr(p, trigger)()
+            assert p.state == state
+
+    def test_invalid_transition(self):
+        p = Player(name='Explanee')
+        with pytest.raises(MachineError):
+            p.play()
+        assert p.state == Player.ST_WORDS
+
+        with pytest.raises(Exception):
+            p.name = 'Other'
+
+    def test_after_callback(self):
+        seen = []
+        saved = Player.after
+        try:
+            Player.after = lambda p: seen.append(p.state)
+            p = Player(name='Explanee')
+            p.reset()
+            Player.after = None
+            p.wait()
+        finally:
+            Player.after = saved
+
+        assert seen == [Player.ST_WORDS, Player.ST_WORDS]
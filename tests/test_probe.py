@@ -0,0 +1,18 @@
+import pickle
+
+from robot.probe import Probe
+
+
+def test_probe():
+    p = Probe()
+    waiting = p.send('guessed')
+    assert not p.receive('explained', waiting)  # broadcast to all, not the reply
+    assert p.receive('next', waiting)
+    assert p.send('words') is None
+
+    other = pickle.loads(pickle.dumps(p))  # collected by other process
+    p.merge(other)
+    data = p.data()
+    assert (data['sent'], data['received']) == (4, 4)
+    assert list(data['latency']) == ['guessed']
+    assert data['latency']['guessed']['count'] == 2
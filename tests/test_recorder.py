@@ -0,0 +1,82 @@
+import gzip
+import json
+
+from app import make_app
+from game.cluster import DEFAULT_ID
+from game.hat import HatGame
+from game.recorder import (Recorder, read)
+from robot.replay import replay
+from robot.robot import client_session
+from tests.test_game import MockWebSocket
+import settings
+
+
+async def recorded_game(tmp_path):
+    g = HatGame(seed=7)
+    g.start_journal(None)
+    Recorder(str(tmp_path)).start(g)
+
+    sockets = [MockWebSocket() for _ in range(3)]
+    for i, ws in enumerate(sockets):
+        await g.cmd(ws, {'cmd': 'name', 'name': f'user{i}'})
+        await g.cmd(ws, {'cmd': 'words', 'words': [f'w{i}{j}' for j in range(g.num_words)]})
+
+    await g.cmd(sockets[0], {'cmd': 'play'})
+    for p in (g.turn.explaining, g.turn.guessing):
+        await g.cmd(p.socket, {'cmd': 'ready'})
+    for guessed in (True, False, True):
+        await g.cmd(g.turn.explaining.socket, {'cmd': 'guessed', 'guessed': guessed})
+
+    g.cancel_timers()
+    await g.recording.flush()
+    return g
+
+
+async def test_recording(tmp_path):
+    g = await recorded_game(tmp_path)
+    header, events = read(g.recording.path)
+
+    assert (header['id'], header['seed'], header['seq']) == (g.id, 7, 1)
+    inbound = [e for e in events if e[0] == '<']
+    assert len(inbound) == 12
+    assert inbound[0][2:] == [0, {'cmd': 'name', 'name': 'user0'}]
+    assert [e[1] for e in events] == sorted(e[1] for e in events)
+    assert all(isinstance(e[3], str) for e in events if e[0] == '>')
+
+
+async def test_replay(tmp_path, aiohttp_server):
+    g = await recorded_game(tmp_path)
+    server = await aiohttp_server(make_app())
+    site = str(server.make_url('')).rstrip('/')
+
+    async with client_session() as session:
+        res = await replay(site, g.recording.path, 0, 5, session)
+        assert res['stalled'] is None and res['mismatch'] is None
+        assert res['commands'] == 12
+
+        # other seed draws other words
+        header, events = read(g.recording.path)
+        path = str(tmp_path / 'other.rec.gz')
+        with gzip.open(path, 'wt') as f:
+            for line in [dict(header, seed=8)] + events:
+                f.write(json.dumps(line) + '\n')
+        res = await replay(site, path, 0, 5, session)
+        assert res['mismatch'] is not None
+
+
+async def test_default_game(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'RECORD_DIR', str(tmp_path))
+    app = make_app()
+    g = app.games[DEFAULT_ID]
+    await g.recording.flush()
+    assert read(g.recording.path)[0]['seq'] == 1  # as of game created by request
+    app.recorder.close()
+
+
+async def test_conn_numbers(tmp_path):
+    g = HatGame()
+    Recorder(str(tmp_path)).start(g)
+    numbers = []
+    for _ in range(5):  # freed socket may have id() of previous one
+        numbers.append(g.recording.conn(MockWebSocket()))
+    assert numbers == list(range(5))
@@ -0,0 +1,91 @@
+from app import make_app
+from game.hat import HatGame
+from game.metrics import METRICS
+from game.registry import GameRegistry
+
+
+def registry(*names):
+    reg = GameRegistry()
+    for name in names:
+        g = HatGame(name=name)
+        reg[g.id] = g
+    return reg
+
+
+def test_find():
+    reg = registry('Alpha', 'beta', ' alpha ', 'gamma')
+    ids = list(reg)
+
+    games, cursor = reg.find()
+    assert [g.id for g in games] == ids and cursor is None
+
+    games, _ = reg.find(name='ALPHA')
+    assert [g.id for g in games] == [ids[0], ids[2]]
+
+    reg[ids[1]].state = HatGame.ST_PLAY
+    games, _ = reg.find(state=HatGame.ST_PLAY)
+    assert [g.id for g in games] == [ids[1]]
+    games, _ = reg.find(name='alpha', state=HatGame.ST_PLAY)
+    assert games == []
+
+    del reg[ids[0]]
+    games, _ = reg.find(name='alpha')
+    assert [g.id for g in games] == [ids[2]]
+
+
+def test_pages():
+    reg = registry(*[f'game{i}' for i in range(7)])
+    ids, listed, cursor = list(reg), [], 0
+    while cursor is not None:
+        games, cursor = reg.find(cursor=cursor, limit=3)
+        listed.extend(g.id for g in games)
+    assert listed == ids
+
+    # removed game does not shift next page
+    games, cursor = reg.find(limit=3)
+    del reg[ids[1]]
+    games, _ = reg.find(cursor=cursor, limit=3)
+    assert [g.id for g in games] == ids[3:6]
+
+
+def test_cache():
+    reg = registry('one', 'two')
+    g = next(iter(reg.values()))
+
+    METRICS.reset()
+    etag, body, _, cursors = reg.page()
+    assert reg.page() == (etag, body, None, cursors)
+    assert cursors == [reg.cursor(gid) for gid in reg]
+    assert METRICS.data()['counters']['games_list_cached'] == 1
+
+    g.state = HatGame.ST_PLAY
+    etag2, body2, _, _ = reg.page()
+    assert etag2 != etag and b'"play"' in body2
+
+    # page of other games keeps its tag
+    etag3, _, _, _ = reg.page(name='two')
+    g.state = HatGame.ST_FINISH
+    assert reg.page(name='two')[0] == etag3
+
+
+async def test_list_games(aiohttp_client):
+    client = await aiohttp_client(make_app())
+    for i in range(3):
+        await client.post('/games', json={'cmd': 'newgame', 'name': f'Page{i}'})
+
+    r = await client.get('/games', params={'name': 'page1'})
+    assert [g['name'] for g in await r.json()] == ['Page1']
+    assert list((await r.json())[0]) == ['id', 'name', 'numwords', 'timer', 'state']  # as before live score
+
+    r = await client.get('/games', params={'limit': 2})
+    assert len(await r.json()) == 2
+    r = await client.get('/games', params={'cursor': r.headers['X-Next-Cursor']})
+    assert [g['name'] for g in await r.json()] == ['Page1', 'Page2']
+    assert 'X-Next-Cursor' not in r.headers
+
+    r = await client.get('/games', params={'name': 'page2'})
+    r = await client.get('/games', headers={'If-None-Match': r.headers['ETag']}, params={'name': 'page2'})
+    assert r.status == 304
+
+    r = await client.get('/games', params={'limit': 'many'})
+    assert r.status == 400
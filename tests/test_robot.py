@@ -0,0 +1,55 @@
+import asyncio
+
+from app import make_app
+from game import message
+from robot.robot import (Robot, client_session)
+
+
+async def test_wait_msg():
+    r = Robot(pname='robot', quiet=True)
+    waiter = asyncio.ensure_future(r.wait_msg(message.Stop, message.Next))
+    await asyncio.sleep(0)
+
+    r.put_msg(message.Start())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    r.put_msg(message.Next(word='one'))
+    assert (await asyncio.wait_for(waiter, 1)).word == 'one'
+
+    r.put_msg(message.Next(word='two'))
+    r.put_msg(message.Stop(reason='timer'))
+    assert isinstance(await r.wait_msg(message.Stop, message.Next), message.Stop)  # first class first
+    assert (await r.get_msg_if_any(message.Next)).word == 'two'
+    assert await r.get_msg_if_any(message.Next) is None
+
+
+async def test_no_stale_waiters():
+    r = Robot(pname='robot', quiet=True)
+    for i in range(100):
+        waiter = asyncio.ensure_future(r.wait_msg(message.Stop, message.Next))
+        await asyncio.sleep(0)
+        r.put_msg(message.Next(word=f'w{i}'))
+        await waiter
+    assert not r.waiters.get(message.Stop)
+
+
+async def test_finish_wakes_waiters():
+    r = Robot(pname='robot', quiet=True)
+    waiter = asyncio.ensure_future(r.wait_msg(message.Turn))
+    await asyncio.sleep(0)
+
+    r.finish = message.Finish()
+    r.wakeup()
+    assert await asyncio.wait_for(waiter, 1) is None
+
+
+async def test_shared_session(aiohttp_server):
+    server = await aiohttp_server(make_app())
+    uri = str(server.make_url('')).rstrip('/')
+
+    async with client_session(limit=1) as session:
+        r = Robot(uri=uri, pname='robot', quiet=True, session=session)
+        gid = await r.newgame()
+        assert await Robot(uri=uri, session=session).checkgame(gid) == gid
+        assert not session.closed  # owned by caller
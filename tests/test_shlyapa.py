@@ -0,0 +1,131 @@
+from unittest import TestCase
+import random
+
+from shlyapa import (Shlyapa, Config, AVA, AVAF, Original)
+import shlyapa.results
+from shlyapa.simulate import simulate_chunk
+
+
+def play(cfg, seed=1):
+    rnd = random.Random(seed)
+    s = Shlyapa(config=cfg)
+    while not s.is_end():
+        left = cfg.number_words - s.get_number_explained_in_cur_tour()
+        s.move_shlyapa(pair_explained_words=min(left, rnd.randint(0, 3)))
+    return s
+
+
+def tables(s):
+    return (s.get_main_table_results(), s.get_explained_table_results(), s.get_guessed_table_results(),
+            s.get_total_score_results(), s.get_explained_score_results(), s.get_guessed_score_results())
+
+
+class TestResults(TestCase):
+
+    def cfg(self, type=AVAF, number_players=5):
+        return Config(type=type, number_players=number_players, number_words=20, number_tours=3,
+                      is_last_turn_in_tour_divisible=False)
+
+    def test_incremental_equals_calculated(self):
+        for cfg in (self.cfg(), self.cfg(Original, 6)):
+            s = play(cfg)
+            incremental = tables(s)
+
+            s.calculate_results()
+            assert tables(s) == incremental
+
+            np = shlyapa.results.np
+            try:
+                shlyapa.results.np = None
+                s.calculate_results()
+                assert tables(s) == incremental
+            finally:
+                shlyapa.results.np = np
+
+            total = sum(incremental[3])
+            assert total == 2 * cfg.number_words * cfg.number_tours
+            for i in range(cfg.number_players):
+                assert s.get_score_results(i) == (incremental[3][i], incremental[4][i], incremental[5][i])
+
+    def test_return_shlyapa(self):
+        s = Shlyapa(config=self.cfg())
+        s.move_shlyapa(pair_explained_words=3)
+        before = tables(s)
+        s.move_shlyapa(pair_explained_words=2)
+        assert s.get_total_score_results() != before[3]
+        s.return_shlyapa()
+        assert tables(s) == before
+
+
+class TestSchedule(TestCase):
+
+    @staticmethod
+    def reference(cfg, turns, change=None):
+        """Pairs computed by algorithm directly on each move, change=(turn, number_players)"""
+        p = cfg.type.get_start_pair(cfg)
+        ret = [(p.explaining, p.guessing)]
+        for t in range(turns):
+            if change and t == change[0]:
+                cfg.set_number_players(change[1])
+            p = cfg.type.get_next_pair(cfg, p, t)
+            ret.append((p.explaining, p.guessing))
+        return ret
+
+    @staticmethod
+    def moves(cfg, turns, change=None):
+        s = Shlyapa(config=cfg)
+        p = s.get_next_pair()
+        ret = [(p.explaining, p.guessing)]
+        for t in range(turns):
+            if change and t == change[0]:
+                cfg.set_number_players(change[1])
+            s.move_shlyapa(pair_explained_words=0)
+            p = s.get_next_pair()
+            ret.append((p.explaining, p.guessing))
+        return ret
+
+    def cfg(self, type, n):
+        return Config(type=type, number_players=n, number_words=1000, number_tours=3,
+                      is_last_turn_in_tour_divisible=False)
+
+    def test_same_pairs(self):
+        for type in (Original, AVA, AVAF):
+            for n in (2, 4, 5, 7, 10):
+                if type == Original and n % 2:
+                    continue
+                turns = 3 * n * n
+                assert self.moves(self.cfg(type, n), turns) == self.reference(self.cfg(type, n), turns)
+
+    def test_number_players_changed(self):
+        for type in (AVA, AVAF):
+            change = (11, 5)
+            assert self.moves(self.cfg(type, 7), 60, change) == self.reference(self.cfg(type, 7), 60, change)
+
+    def test_return_shlyapa(self):
+        s = Shlyapa(config=self.cfg(AVAF, 5))
+        for _ in range(7):
+            s.move_shlyapa(pair_explained_words=1)
+        p7 = s.get_next_pair()
+        s.move_shlyapa(pair_explained_words=1)
+        p8 = s.get_next_pair()
+        s.return_shlyapa()
+        assert s.get_next_pair() == p7
+        s.move_shlyapa(pair_explained_words=1)
+        assert s.get_next_pair() == p8
+
+
+class TestSimulate(TestCase):
+
+    def test_chunk(self):
+        stats = simulate_chunk('AVAF', 5, words=4, tours=3, divisible=False, explain_max=3, games=20, seed=1)
+        assert stats.games == 20
+        means = stats.means()
+        assert means['pair_coverage'] == 1.0
+        assert means['explain_spread'] <= 1
+        assert means['turns'] > 0
+
+    def test_merge(self):
+        args = ('AVA', 4, 3, 2, True, 2)
+        a = simulate_chunk(*args, games=5, seed=1)
+        a.merge(simulate_chunk(*args, games=5, seed=2))
+        assert a.games == 10
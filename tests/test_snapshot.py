@@ -0,0 +1,56 @@
+import asyncio
+
+from game import message
+from game import snapshot
+from game.hat import HatGame
+from tests.test_eventlog import (login, play, state)
+
+
+async def test_roundtrip(tmp_path):
+    g = HatGame()
+    await login(g)
+    await play(g)
+
+    path = str(tmp_path / 'games.pickle')
+    await snapshot.save({g.id: g}, path)
+    restored = snapshot.load(path)[g.id]
+    assert not (tmp_path / 'games.pickle').exists()
+    assert state(restored) == state(g)
+    assert restored.turn.explaining is restored.players_map[g.turn.explaining.name]
+
+    # both copies go on the same way
+    for x in (g, restored):
+        await x.guessed(x.turn.explaining.socket, message.Guessed(guessed=True))
+    assert state(restored) == state(g)
+
+    g.cancel_timers()
+
+
+async def test_resume_timer():
+    g = HatGame(timer=0.2)
+    await login(g)
+    await play(g)
+    await asyncio.sleep(0.1)
+
+    restored = snapshot.loads(await snapshot.dumps({g.id: g}))[g.id]
+    g.cancel_timers()
+    assert 0 < restored.timer_left < 0.2
+
+    restored.resume()
+    await asyncio.sleep(0.15)
+    assert restored.timer is None  # expired with time left
+    assert restored.turn.explaining.state == 'lastanswer'
+
+
+async def test_reconnect():
+    g = HatGame()
+    await login(g)
+    await play(g)
+    g.cancel_timers()
+
+    restored = snapshot.loads(await snapshot.dumps({g.id: g}))[g.id]
+    ws = type(g.players[0].socket)()
+    name = restored.players[0].name
+    await restored.cmd(ws, {'cmd': 'name', 'name': name})
+    assert restored.players_map[name].socket is ws
+    assert len(restored.players) == len(g.players)
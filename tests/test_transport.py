@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+
+from app import make_app
+from game.cluster import Cluster
+from game.metrics import METRICS
+from game.outbox import Outbox
+from game.transport import (LocalSocketTransport, MemoryTransport, RemoteSocket, Transport)
+from tests.test_game import MockWebSocket
+
+
+def memory(tmp_path):
+    hub = {}
+    return [MemoryTransport(node, hub) for node in ('a', 'b')]
+
+
+def ipc(tmp_path):
+    return [LocalSocketTransport(node, str(tmp_path)) for node in ('a', 'b')]
+
+
+@pytest.mark.parametrize('make', [memory, ipc])
+async def test_frames(tmp_path, make):
+    a, b = make(tmp_path)
+    for t in (a, b):
+        await t.start()
+
+    ws = MockWebSocket()
+    b.sockets[1] = Outbox(ws)
+
+    METRICS.reset()
+    remote = a.remote('b', 1)
+    for frame in ('f1', 'f2', 'f3'):
+        await remote.send_str(frame)
+    await asyncio.sleep(0.05)
+    await b.sockets[1].drain()
+
+    assert [c.args[0] for c in ws.send_str.await_args_list] == ['f1', 'f2', 'f3']
+    data = METRICS.data()
+    assert data['counters']['transport_batches'] == 1  # one batch per node and loop iteration
+    assert data['timers']['fanout']['count'] == 1
+
+    await remote.close()
+    await asyncio.sleep(0.05)
+    assert 1 not in b.sockets
+    ws.close.assert_awaited()
+
+    for t in (a, b):
+        await t.close()
+
+
+async def test_remote_overflow():
+    """Slow remote player loses superseded state frame only, as local one does"""
+    a, b = memory(None)
+    ws = MockWebSocket()
+    gate = asyncio.Event()
+
+    async def send(frame):
+        await gate.wait()
+
+    ws.send_str.side_effect = send
+    b.sockets[1] = Outbox(ws, size=2, policy=Outbox.POLICY_DROP)
+
+    remote = a.remote('b', 1)
+    for frame, cmd in (('in-flight', 'start'), ('game1', 'game'), ('next1', 'next'), ('game2', 'game')):
+        remote.send_frame(frame, cmd)
+        await asyncio.sleep(0.01)
+
+    gate.set()
+    await b.sockets[1].drain()
+    assert not b.sockets[1].closed
+    assert [c.args[0] for c in ws.send_str.await_args_list] == ['in-flight', 'next1', 'game2']
+    ws.close.assert_not_awaited()
+
+
+async def test_remote_players(aiohttp_server, aiohttp_client):
+    """Player connected to worker 1 plays game owned by worker 0"""
+    hub, peers = {}, [None, None]
+    apps = [make_app(Cluster(i, 2, peers=peers), MemoryTransport(str(i), hub)) for i in range(2)]
+    servers = [await aiohttp_server(app) for app in apps]
+    for i, s in enumerate(servers):
+        peers[i] = str(s.make_url('')).rstrip('/')
+    client = await aiohttp_client(servers[1])
+
+    r = await (await aiohttp_client(servers[0])).post('/games', json={'cmd': 'newgame'})
+    gid = (await r.json())['id']
+
+    ws = await client.ws_connect(f'/ws/{gid}')
+    await ws.send_json({'cmd': 'name', 'name': 'remote'})
+    assert (await ws.receive_json())['cmd'] == 'game'
+    assert (await ws.receive_json())['cmd'] == 'prepare'
+
+    p = apps[0].games[gid].players_map['remote']
+    assert isinstance(p.socket, RemoteSocket)
+    await ws.close()
+    await asyncio.sleep(0.05)
+
+    # game keeps player, but nothing goes to closed connection any more
+    g = apps[0].games[gid]
+    assert p.socket.closed and id(p.socket) not in g.outboxes
+    assert not apps[0].transport.remotes
+
+    ws = await client.ws_connect(f'/ws/{gid}')
+    await ws.send_json({'cmd': 'name', 'name': 'other'})
+    assert (await ws.receive_json())['cmd'] == 'game'
+    assert g.players_map['other'].socket.conn != p.socket.conn  # connection numbers are not reused
+    await ws.close()
+
+
+def test_abstract():
+    with pytest.raises(TypeError):
+        Transport('a')
@@ -0,0 +1,67 @@
+from unittest import TestCase
+import pickle
+import random
+import pytest
+
+from game.wordhat import WordHat
+
+
+class TestWordHat(TestCase):
+
+    def test_draw_all(self):
+        words = [f'w{i}' for i in range(20)]
+        h = WordHat(words)
+        assert len(h) == 20
+
+        drawn = [h.draw() for _ in range(20)]
+        assert sorted(drawn) == sorted(words)
+        assert len(h) == 0
+
+        with pytest.raises(ValueError):
+            h.draw()
+
+    def test_put_back(self):
+        words = ['a', 'b', 'c', 'd', 'e', 'f']
+        h = WordHat(words)
+        h.draw()
+        h.put_back([])
+
+        turn = [h.draw() for _ in range(3)]
+        h.put_back([turn[0], turn[2]])
+        assert len(h) == 4
+        assert turn[0] in list(h)
+        assert turn[2] in list(h)
+        assert turn[1] not in list(h)
+
+        left = [h.draw() for _ in range(4)]
+        assert sorted(left + [turn[1]] + [w for w in words if w not in left and w != turn[1]]) == sorted(words)
+
+    def test_put_back_duplicates(self):
+        h = WordHat(['a', 'a', 'b'])
+        turn = [h.draw() for _ in range(3)]
+        h.put_back(['a'])
+        assert list(h) == ['a']
+        assert sorted(turn) == ['a', 'a', 'b']
+
+    def test_reset(self):
+        words = ['a', 'b', 'c']
+        h = WordHat(words)
+        h.draw()
+        h.draw()
+        h.reset()
+        assert sorted(h) == words
+
+        h.fill([])
+        assert len(h) == 0
+
+    def test_seed(self):
+        words = [f'w{i}' for i in range(50)]
+        h1 = WordHat(words, rng=random.Random(42))
+        h2 = WordHat(words, rng=random.Random(42))
+        assert [h1.draw() for _ in range(50)] == [h2.draw() for _ in range(50)]
+
+    def test_restore(self):
+        h = WordHat([f'w{i}' for i in range(20)], rng=random.Random(1))
+        h.draw()
+        restored = pickle.loads(pickle.dumps(h))  # generator caught up on first draw
+        assert [restored.draw() for _ in range(5)] == [h.draw() for _ in range(5)]
@@ -45,6 +45,7 @@ export default class Game {
 
     @observable gameState: GameState = GameState.SETUP;
     @observable players: PlayerMap = {};
+    rosterVersion: number = 0;
     @observable myState: PlayerState = PlayerState.UNKNOWN;
     @observable myRole: PlayerRole = PlayerRole.WATCHER;
     @observable gameNumWords: number | null = null;
@@ -68,6 +69,9 @@ export default class Game {
         this.commands = {
             game: this.cmdGame,
             prepare: this.cmdPrepare,
+            joined: this.cmdJoined,
+            left: this.cmdLeft,
+            updated: this.cmdUpdated,
             wait: this.cmdWait,
             tour: this.cmdTour,
             turn: this.cmdTurn,
@@ -186,7 +190,7 @@ export default class Game {
     };
 
     @action.bound
-    cmdPrepare(data: { players: { [player: string]: any[] } }) {
+    cmdPrepare(data: { players: { [player: string]: any[] }, version: number }) {
         this.players = {};
         for (const [name, v] of Object.entries(data.players)) {
             this.players[name] = {
@@ -195,6 +199,52 @@ export default class Game {
                 avatar: v[1] || `https://robohash.org/${name}?set=set4`
             };
         }
+        this.rosterVersion = data.version || 0;
+    };
+
+    // Roster deltas, older then last received snapshot are ignored
+    isNewRosterVersion(version: number): boolean {
+        if (version <= this.rosterVersion) {
+            return false;
+        }
+        this.rosterVersion = version;
+        return true;
+    }
+
+    @action.bound
+    cmdJoined(data: { name: string, avatar: string | null, words: number, version: number }) {
+        if (!this.isNewRosterVersion(data.version)) {
+            return;
+        }
+        this.players = {
+            ...this.players,
+            [data.name]: {
+                name: data.name,
+                words: data.words,
+                avatar: data.avatar || `https://robohash.org/${data.name}?set=set4`
+            }
+        };
+    };
+
+    @action.bound
+    cmdLeft(data: { name: string, version: number }) {
+        if (!this.isNewRosterVersion(data.version)) {
+            return;
+        }
+        const players = { ...this.players };
+        delete players[data.name];
+        this.players = players;
+    };
+
+    @action.bound
+    cmdUpdated(data: { name: string, words: number, version: number }) {
+        if (!this.isNewRosterVersion(data.version) || !this.players[data.name]) {
+            return;
+        }
+        this.players = {
+            ...this.players,
+            [data.name]: { ...this.players[data.name], words: data.words }
+        };
     };
 
     @action.bound